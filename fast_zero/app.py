@@ -1,13 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
 from http import HTTPStatus
+from time import perf_counter
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
-from fast_zero.routers import auth, todos, users
+from fast_zero.database import (
+    engine,
+    query_diagnostics,
+    read_your_writes,
+    replicas,
+)
+from fast_zero.events import broker
+from fast_zero.limits import load_shedder
+from fast_zero.metrics import request_metrics, route_template
+from fast_zero.purge import purge_trash_forever
+from fast_zero.replicas import SAFE_METHODS
+from fast_zero.revocation import revocation_list
+from fast_zero.routers import auth, metrics, todos, users
 from fast_zero.schemas import Message
+from fast_zero.settings import Settings
 
-app = FastAPI()
+settings = Settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await broker.start()
+
+    purge = None
+    if settings.TRASH_PURGE_INTERVAL_SECONDS:
+        purge = asyncio.create_task(
+            purge_trash_forever(
+                engine,
+                interval=settings.TRASH_PURGE_INTERVAL_SECONDS,
+                retention=timedelta(days=settings.TRASH_RETENTION_DAYS),
+                batch_size=settings.TRASH_PURGE_BATCH_SIZE,
+            )
+        )
+
+    revocation_sync = None
+    if settings.TOKEN_REVOCATION_SYNC_SECONDS:
+        revocation_sync = asyncio.create_task(
+            revocation_list.sync_forever(
+                engine, settings.TOKEN_REVOCATION_SYNC_SECONDS
+            )
+        )
+
+    yield
+
+    for task in (purge, revocation_sync):
+        if task:
+            task.cancel()
+
+    await broker.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth.router)
+app.include_router(metrics.router)
 app.include_router(todos.router)
 app.include_router(users.router)
 
@@ -15,3 +69,60 @@ app.include_router(users.router)
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
 def read_root():
     return {'message': 'Olá, Mundo!'}
+
+
+@app.middleware('http')
+async def shed_load(request: Request, call_next):
+    if not load_shedder.acquire():
+        return JSONResponse(
+            {'detail': 'Server is overloaded, try again later'},
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'},
+        )
+
+    try:
+        return await call_next(request)
+    finally:
+        load_shedder.release()
+
+
+@app.middleware('http')
+async def stick_to_primary(request: Request, call_next):
+    response = await call_next(request)
+
+    # Replicas may lag behind, so a client that just wrote reads from the
+    # primary for a while to see its own changes
+    if (
+        replicas
+        and request.method not in SAFE_METHODS
+        and response.status_code < HTTPStatus.BAD_REQUEST
+    ):
+        await read_your_writes.mark(request)
+
+    return response
+
+
+@app.middleware('http')
+async def track_queries(request: Request, call_next):
+    with query_diagnostics.track(request):
+        return await call_next(request)
+
+
+@app.middleware('http')
+async def record_metrics(request: Request, call_next):
+    request_metrics.in_flight += 1
+    status_code = HTTPStatus.INTERNAL_SERVER_ERROR
+    start = perf_counter()
+
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        request_metrics.in_flight -= 1
+        request_metrics.observe(
+            request.method,
+            route_template(request),
+            int(status_code),
+            perf_counter() - start,
+        )
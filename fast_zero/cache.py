@@ -0,0 +1,275 @@
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from urllib.parse import urlsplit
+
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+
+        if item is None or item[0] <= monotonic():
+            self._data.pop(key, None)
+            return None
+
+        self._data.move_to_end(key)
+        return item[1]
+
+    def set(self, key, value, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class CacheError(Exception):
+    pass
+
+
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, maxsize: int):
+        self._cache = TTLCache(maxsize, ttl=float('inf'))
+
+    async def get(self, key: str):
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self._cache.delete(key)
+
+    async def incr(self, key: str, ttl: float | None = None):
+        value = int(self._cache.get(key) or 0) + 1
+        self._cache.set(key, str(value).encode(), ttl)
+        return value
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RedisBackend:
+    name = 'redis'
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 1.0,
+        pool_size: int = 10,
+        retry_after: float = 5.0,
+    ):
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.down_until = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def get(self, key: str):
+        return await self._command('GET', key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None):
+        if ttl is None:
+            await self._command('SET', key, value)
+        else:
+            await self._command('SET', key, value, 'PX', int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._command('DEL', key)
+
+    async def incr(self, key: str, ttl: float | None = None):
+        value = await self._command('INCR', key)
+        if ttl is not None and value == 1:
+            await self._command('PEXPIRE', key, int(ttl * 1000))
+        return value
+
+    def clear(self):
+        pass
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+    async def _command(self, *args):
+        # After a failure every call is a miss until retry_after has passed,
+        # so an unreachable Redis costs requests nothing instead of a timeout
+        if monotonic() < self.down_until:
+            raise CacheError(f'Redis {args[0]} skipped')
+
+        try:
+            # The timeout covers waiting for a connection and the handshake
+            # too, so a blackholed Redis cannot queue requests behind it
+            async with asyncio.timeout(self.timeout):
+                return await self._run(*args)
+        except (
+            OSError,
+            asyncio.TimeoutError,
+            asyncio.IncompleteReadError,
+        ):
+            self.down_until = monotonic() + self.retry_after
+            raise CacheError(f'Redis {args[0]} failed')
+
+    async def _run(self, *args):
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await self._connect()
+                reply = await self._send(connection, *args)
+            except BaseException:
+                # A failed or cancelled command may leave its reply unread
+                # on the socket, where the next command would read it
+                if connection is not None:
+                    connection[1].close()
+                raise
+
+            self._idle.append(connection)
+            return reply
+
+    async def _connect(self):
+        connection = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._send(connection, 'AUTH', self.password)
+            if self.db:
+                await self._send(connection, 'SELECT', self.db)
+        except BaseException:
+            connection[1].close()
+            raise
+
+        return connection
+
+    @staticmethod
+    async def _send(connection, *args):
+        reader, writer = connection
+        writer.write(encode_command(*args))
+        await writer.drain()
+        return await read_reply(reader)
+
+
+def encode_command(*args):
+    chunks = [f'*{len(args)}\r\n'.encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        chunks += [f'${len(data)}\r\n'.encode(), data, b'\r\n']
+    return b''.join(chunks)
+
+
+async def read_reply(reader):
+    line = await reader.readline()
+    prefix, payload = line[:1], line[1:-2]
+
+    if prefix == b'+':
+        return payload
+    if prefix == b'-':
+        raise CacheError(payload.decode())
+    if prefix == b':':
+        return int(payload)
+    if prefix == b'$':
+        length = int(payload)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b'*':
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+
+    raise asyncio.IncompleteReadError(line, None)
+
+
+def create_backend(url: str, maxsize: int):
+    if url.startswith('redis://'):
+        return RedisBackend(
+            url,
+            timeout=settings.CACHE_TIMEOUT_SECONDS,
+            pool_size=settings.CACHE_POOL_SIZE,
+            retry_after=settings.CACHE_RETRY_SECONDS,
+        )
+
+    return MemoryBackend(maxsize)
+
+
+class Cache:
+    def __init__(self, backend, prefix: str, ttl: float):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    async def get(self, key: str):
+        if not self.enabled:
+            return None
+
+        try:
+            value = await self.backend.get(self.prefix + key)
+        except CacheError:
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes):
+        if not self.enabled:
+            return
+
+        try:
+            await self.backend.set(self.prefix + key, value, self.ttl)
+        except CacheError:
+            pass
+
+    async def delete(self, key: str):
+        try:
+            await self.backend.delete(self.prefix + key)
+        except CacheError:
+            pass
+
+    def clear_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+cache_backend = create_backend(settings.CACHE_URL, settings.CACHE_MAX_ENTRIES)
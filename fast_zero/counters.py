@@ -0,0 +1,78 @@
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import TodoCounter, TodoListVersion, TodoState
+
+UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+async def adjust_counters(session: AsyncSession, deltas: Counter):
+    # Rows are upserted, and so locked, in key order: concurrent writes
+    # that touch the same counters in opposite orders would deadlock
+    values = [
+        {'user_id': user_id, 'state': state, 'count': delta}
+        for (user_id, state), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not values:
+        return
+
+    insert = UPSERTS[session.bind.dialect.name](TodoCounter).values(values)
+    await session.execute(
+        insert.on_conflict_do_update(
+            index_elements=[TodoCounter.user_id, TodoCounter.state],
+            set_={'count': TodoCounter.count + insert.excluded.count},
+        )
+    )
+
+
+async def bump_list_versions(session: AsyncSession, user_ids):
+    # The row lock taken here orders concurrent writers of the same user,
+    # so every commit leaves a version no reader has seen before
+    values = [
+        {'user_id': user_id, 'version': 1} for user_id in sorted(set(user_ids))
+    ]
+    if not values:
+        return
+
+    insert = UPSERTS[session.bind.dialect.name](TodoListVersion).values(values)
+    await session.execute(
+        insert.on_conflict_do_update(
+            index_elements=[TodoListVersion.user_id],
+            set_={'version': TodoListVersion.version + 1},
+        )
+    )
+
+
+async def read_list_version(session: AsyncSession, user_id: int):
+    version = await session.scalar(
+        select(TodoListVersion.version).where(
+            TodoListVersion.user_id == user_id
+        )
+    )
+    return version or 0
+
+
+def state_changes(user_id: int, before: TodoState, after: TodoState):
+    deltas = Counter()
+    deltas[user_id, before] -= 1
+    deltas[user_id, after] += 1
+
+    return deltas
+
+
+async def read_counters(session: AsyncSession, user_id: int):
+    counters = await session.execute(
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == user_id
+        )
+    )
+    states = dict.fromkeys(TodoState, 0) | dict(counters.all())
+
+    return {
+        'states': states,
+        'active': sum(states.values()) - states[TodoState.trash],
+    }
@@ -1,11 +1,87 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fast_zero.cache import Cache, cache_backend
+from fast_zero.diagnostics import QueryDiagnostics
+from fast_zero.metrics import PoolMetrics, StatementMetrics
+from fast_zero.replicas import SAFE_METHODS, ReadYourWrites, ReplicaSet
 from fast_zero.settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL)
+settings = Settings()
+
+
+def _create_engine(url: str):
+    return create_async_engine(
+        url,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL)
+replicas = ReplicaSet(
+    [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    retry_after=settings.DATABASE_REPLICA_RETRY_SECONDS,
+)
+read_your_writes = ReadYourWrites(
+    Cache(cache_backend, 'primary:', settings.READ_YOUR_WRITES_SECONDS)
+)
+
+pool_metrics = PoolMetrics()
+pool_metrics.instrument(engine)
+statement_metrics = StatementMetrics()
+
+query_diagnostics = QueryDiagnostics(
+    slow_threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+    repeat_threshold=settings.N_PLUS_ONE_THRESHOLD,
+    budget=settings.STATEMENT_BUDGET,
+)
+
+for bind in (engine, *replicas.engines):
+    statement_metrics.instrument(bind)
+    if settings.QUERY_DIAGNOSTICS or settings.STATEMENT_BUDGET:
+        query_diagnostics.instrument(bind)
+
+
+@asynccontextmanager
+async def primary_session(request: Request):
+    # get_session and get_read_session share the primary session of a
+    # request, so the user from get_current_user stays attached to the
+    # session that write handlers commit
+    session = getattr(request.state, 'primary_session', None)
+    if session is not None:
+        yield session
+        return
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await pool_metrics.connect(session)
+        request.state.primary_session = session
+        yield session
+
+
+async def get_session(request: Request):  # pragma: no cover
+    async with primary_session(request) as session:
+        yield session
+
+
+async def get_read_session(request: Request):
+    session = None
+    if (
+        replicas
+        and request.method in SAFE_METHODS
+        and not await read_your_writes.active(request)
+    ):
+        session = await replicas.connect()
 
+    if session is None:
+        async with primary_session(request) as session:
+            yield session
+        return
 
-def get_session():  # pragma: no cover
-    with Session(engine) as session:
+    async with session:
         yield session
@@ -0,0 +1,111 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+
+from fast_zero.metrics import UNMATCHED_ROUTE, route_template
+
+logger = logging.getLogger(__name__)
+
+
+class StatementBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestStatements:
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.repeats = Counter()
+
+    @property
+    def route(self):
+        return route_template(self.request)
+
+
+current_statements = ContextVar('current_statements', default=None)
+
+
+class QueryDiagnostics:
+    def __init__(
+        self,
+        slow_threshold: float,
+        repeat_threshold: int,
+        budget: int,
+        strict: bool = False,
+    ):
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.budget = budget
+        self.strict = strict
+
+    def instrument(self, engine):
+        sync_engine = getattr(engine, 'sync_engine', engine)
+        if event.contains(sync_engine, 'after_cursor_execute', self._on_after):
+            return
+
+        event.listen(
+            sync_engine, 'before_cursor_execute', self._on_before, named=True
+        )
+        event.listen(
+            sync_engine, 'after_cursor_execute', self._on_after, named=True
+        )
+
+    @staticmethod
+    def _on_before(context, **kw):
+        if context is not None:
+            context.diagnostics_started_at = perf_counter()
+
+    def _on_after(self, statement, context, **kw):
+        statements = current_statements.get()
+        if statements is not None:
+            statements.count += 1
+            statements.repeats[statement] += 1
+
+        started_at = getattr(context, 'diagnostics_started_at', None)
+        if started_at is None:
+            return
+
+        elapsed = perf_counter() - started_at
+        if elapsed >= self.slow_threshold:
+            logger.warning(
+                'Slow query (%.1f ms) on %s: %s',
+                elapsed * 1000,
+                statements.route if statements else UNMATCHED_ROUTE,
+                statement,
+            )
+
+    @contextmanager
+    def track(self, request):
+        statements = RequestStatements(request)
+        token = current_statements.set(statements)
+        try:
+            yield statements
+        finally:
+            current_statements.reset(token)
+
+        self.report(statements)
+
+    def report(self, statements):
+        for statement, count in statements.repeats.items():
+            if count >= self.repeat_threshold:
+                logger.warning(
+                    'Possible N+1 on %s: %d identical statements: %s',
+                    statements.route,
+                    count,
+                    statement,
+                )
+
+        if self.budget and statements.count > self.budget:
+            message = (
+                f'{statements.route} ran {statements.count} statements, '
+                f'budget is {self.budget}'
+            )
+            # The handler has already committed by now, so outside tests
+            # a breach is only logged instead of failing a done request
+            if self.strict:
+                raise StatementBudgetExceeded(message)
+            logger.error('Statement budget exceeded: %s', message)
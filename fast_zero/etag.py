@@ -0,0 +1,27 @@
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(part) for part in parts).encode()
+    return f'"{blake2b(raw, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str):
+    header = request.headers.get('if-none-match')
+
+    if not header:
+        return False
+
+    if header.strip() == '*':
+        return True
+
+    return etag in {tag.strip() for tag in header.split(',')}
+
+
+def not_modified(etag: str):
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
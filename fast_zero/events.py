@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+
+from psycopg import AsyncConnection
+from psycopg import Error as PsycopgError
+from sqlalchemy import make_url
+
+from fast_zero.settings import Settings
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'todo_events'
+RESYNC = {'type': 'resync', 'ids': []}
+
+
+class MemoryBroker:
+    name = 'memory'
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = defaultdict(set)
+        self.dropped = 0
+
+    @contextmanager
+    def subscribe(self, user_id: int):
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers[user_id].discard(queue)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+    def deliver(self, user_id: int, event: dict):
+        for queue in self.subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client this far behind has to catch up through
+                # /todos/changes anyway, so replace its backlog with a hint
+                self.dropped += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def resync_all(self):
+        for user_id in self.subscribers:
+            self.deliver(user_id, RESYNC)
+
+    async def publish(self, user_id: int, event: dict):
+        self.deliver(user_id, event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'subscribers': sum(map(len, self.subscribers.values())),
+            'dropped': self.dropped,
+        }
+
+
+class PostgresBroker(MemoryBroker):
+    name = 'postgres'
+
+    def __init__(self, url: str, queue_size: int, reconnect_delay=1.0):
+        super().__init__(queue_size)
+        self.conninfo = (
+            make_url(url)
+            .set(drivername='postgresql')
+            .render_as_string(hide_password=False)
+        )
+        self.reconnect_delay = reconnect_delay
+        self._publisher = None
+        self._listener = None
+        self._lock = asyncio.Lock()
+
+    async def publish(self, user_id: int, event: dict):
+        payload = json.dumps({'user_id': user_id, **event})
+
+        async with self._lock:
+            try:
+                if self._publisher is None:
+                    self._publisher = await AsyncConnection.connect(
+                        self.conninfo, autocommit=True
+                    )
+                await self._publisher.execute(
+                    'SELECT pg_notify(%s, %s)', (CHANNEL, payload)
+                )
+            except (OSError, PsycopgError):
+                logger.exception('Publishing todo event failed')
+                await self._close_publisher()
+                # Other workers miss this one, but local subscribers do not
+                self.deliver(user_id, event)
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        self._listener = None
+        await self._close_publisher()
+
+    async def _close_publisher(self):
+        if self._publisher is not None:
+            await self._publisher.close()
+        self._publisher = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await AsyncConnection.connect(
+                    self.conninfo, autocommit=True
+                ) as connection:
+                    await connection.execute(f'LISTEN {CHANNEL}')
+                    async for notify in connection.notifies():
+                        event = json.loads(notify.payload)
+                        self.deliver(event.pop('user_id'), event)
+            except (OSError, PsycopgError):
+                logger.exception('Listening for todo events failed')
+
+            # Anything published while disconnected was lost
+            self.resync_all()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def create_broker(backend: str, queue_size: int):
+    if backend == 'postgres':
+        return PostgresBroker(settings.DATABASE_URL, queue_size)
+
+    return MemoryBroker(queue_size)
+
+
+def format_event(event: dict):
+    return f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+
+
+async def event_stream(broker, user_id: int, heartbeat: float):
+    with broker.subscribe(user_id) as queue:
+        yield ': connected\n\n'
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat)
+            except TimeoutError:
+                # Keeps proxies from closing idle connections
+                yield ': keepalive\n\n'
+                continue
+
+            yield format_event(event)
+
+
+async def publish(user_id: int, event_type: str, ids):
+    await broker.publish(user_id, {'type': event_type, 'ids': [*ids]})
+
+
+broker = create_broker(settings.EVENTS_BACKEND, settings.EVENTS_QUEUE_SIZE)
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from enum import Enum
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPORT_COLUMNS = ('id', 'title', 'description', 'state')
+
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: 'application/x-ndjson',
+    ExportFormat.csv: 'text/csv',
+}
+
+
+def _as_dict(row):
+    return {
+        key: value.value if isinstance(value, Enum) else value
+        for key, value in row._mapping.items()
+    }
+
+
+def ndjson_chunk(rows):
+    return ''.join(json.dumps(_as_dict(row)) + '\n' for row in rows)
+
+
+def csv_header():
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writerows(_as_dict(row) for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_export(engine, query, export_format: ExportFormat):
+    # The request's session is closed by get_session before the response
+    # body starts streaming, so the stream holds its own session open
+    async with AsyncSession(engine) as session:
+        if export_format == ExportFormat.csv:
+            yield csv_header()
+
+        encode = (
+            csv_chunk if export_format == ExportFormat.csv else ndjson_chunk
+        )
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield encode(partition)
@@ -0,0 +1,117 @@
+from http import HTTPStatus
+from math import ceil
+from time import monotonic
+
+from fastapi import HTTPException, Request
+from jwt import PyJWTError
+
+from fast_zero.cache import TTLCache
+from fast_zero.settings import Settings
+from fast_zero.tokens import token_verifier
+
+settings = Settings()
+
+MAX_TRACKED_CLIENTS = 100_000
+
+
+def client_key(request: Request):
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+
+    if scheme.lower() == 'bearer' and token:
+        try:
+            payload = token_verifier.verify(token)
+            if payload.get('sub'):
+                return f'user:{payload["sub"]}'
+        except PyJWTError:
+            pass
+
+    return f'ip:{request.client.host if request.client else "unknown"}'
+
+
+class RateLimiter:
+    def __init__(self, name: str, per_minute: int, burst: int):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.allowed = 0
+        self.rejected = 0
+        # An idle bucket is full again after burst / rate seconds, so
+        # forgetting it after that is the same as keeping it. A rate of 0
+        # disables the limiter
+        self._buckets = TTLCache(
+            MAX_TRACKED_CLIENTS,
+            ttl=burst / self.rate if self.rate > 0 else 0,
+        )
+
+    def acquire(self, key: str):
+        if self.rate <= 0:
+            self.allowed += 1
+            return 0
+
+        now = monotonic()
+        tokens, updated_at = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now))
+            self.rejected += 1
+            return ceil((1 - tokens) / self.rate)
+
+        self._buckets.set(key, (tokens - 1, now))
+        self.allowed += 1
+        return 0
+
+    async def __call__(self, request: Request):
+        retry_after = self.acquire(client_key(request))
+
+        if retry_after:
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail='Too many requests',
+                headers={'Retry-After': str(retry_after)},
+            )
+
+    def clear(self):
+        self._buckets.clear()
+        self.allowed = 0
+        self.rejected = 0
+
+    def stats(self):
+        return {'allowed': self.allowed, 'rejected': self.rejected}
+
+
+class LoadShedder:
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.shed = 0
+
+    def acquire(self):
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            return False
+
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'shed': self.shed,
+        }
+
+
+auth_rate_limiter = RateLimiter(
+    'auth', settings.AUTH_RATE_LIMIT_PER_MINUTE, settings.AUTH_RATE_LIMIT_BURST
+)
+todos_rate_limiter = RateLimiter(
+    'todos',
+    settings.TODOS_RATE_LIMIT_PER_MINUTE,
+    settings.TODOS_RATE_LIMIT_BURST,
+)
+rate_limiters = (auth_rate_limiter, todos_rate_limiter)
+load_shedder = LoadShedder(settings.MAX_IN_FLIGHT_REQUESTS)
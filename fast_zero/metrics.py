@@ -0,0 +1,216 @@
+from collections import Counter
+from time import perf_counter
+
+from sqlalchemy import event
+
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+REQUEST_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)  # fmt: skip
+STATEMENT_DURATION_BUCKETS = (
+    0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5,
+)  # fmt: skip
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.count
+
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkout_wait = Histogram(POOL_WAIT_BUCKETS)
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.pool = None
+
+    def instrument(self, engine):
+        sync_engine = getattr(engine, 'sync_engine', engine)
+        self.pool = sync_engine.pool
+        event.listen(sync_engine, 'checkout', self._on_checkout)
+
+    def _on_checkout(self, dbapi_connection, connection_record, proxy):
+        self.checkouts += 1
+
+        checked_out = self._call('checkedout')
+        if checked_out is not None and checked_out > self._call('size'):
+            self.overflow_events += 1
+
+    def _call(self, name):
+        method = getattr(self.pool, name, None)
+        return method() if method else None
+
+    async def connect(self, session):
+        start = perf_counter()
+        await session.connection()
+        self.checkout_wait.observe(perf_counter() - start)
+
+    def snapshot(self):
+        return {
+            'size': self._call('size'),
+            'checked_out': self._call('checkedout'),
+            'overflow': self._call('overflow'),
+            'checkouts': self.checkouts,
+            'overflow_events': self.overflow_events,
+            'checkout_wait': self.checkout_wait.snapshot(),
+        }
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.durations = {}
+        self.responses = Counter()
+        self.in_flight = 0
+
+    def observe(self, method, route, status_code, duration):
+        key = (method, route)
+        if key not in self.durations:
+            self.durations[key] = Histogram(REQUEST_DURATION_BUCKETS)
+
+        self.durations[key].observe(duration)
+        self.responses[method, route, status_code] += 1
+
+    def clear(self):
+        self.durations.clear()
+        self.responses.clear()
+
+
+def route_template(request):
+    route = request.scope.get('route')
+    return getattr(route, 'path', UNMATCHED_ROUTE)
+
+
+class StatementMetrics:
+    def __init__(self):
+        self.durations = {}
+
+    def instrument(self, engine):
+        sync_engine = getattr(engine, 'sync_engine', engine)
+        event.listen(
+            sync_engine, 'before_cursor_execute', self._on_before, named=True
+        )
+        event.listen(
+            sync_engine, 'after_cursor_execute', self._on_after, named=True
+        )
+
+    @staticmethod
+    def _on_before(context, **kw):
+        if context is not None:
+            context.metrics_started_at = perf_counter()
+
+    def _on_after(self, statement, context, **kw):
+        started_at = getattr(context, 'metrics_started_at', None)
+        if started_at is None:
+            return
+
+        # Label by verb only: full statements would explode the cardinality
+        verb = statement.split(None, 1)[0].upper() if statement else 'OTHER'
+        if verb not in self.durations:
+            self.durations[verb] = Histogram(STATEMENT_DURATION_BUCKETS)
+
+        self.durations[verb].observe(perf_counter() - started_at)
+
+    def clear(self):
+        self.durations.clear()
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+
+    pairs = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return '{' + ','.join(pairs) + '}'
+
+
+def _histogram_lines(name, histogram, **labels):
+    snapshot = histogram.snapshot()
+    for bound, count in snapshot['buckets'].items():
+        yield f'{name}_bucket{_labels(**labels, le=bound)} {count}'
+    yield f'{name}_sum{_labels(**labels)} {snapshot["sum"]}'
+    yield f'{name}_count{_labels(**labels)} {snapshot["count"]}'
+
+
+def render_prometheus(request_metrics, statement_metrics, pool_metrics):
+    lines = [
+        '# HELP http_request_duration_seconds Request latency by route.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (method, route), histogram in request_metrics.durations.items():
+        lines.extend(
+            _histogram_lines(
+                'http_request_duration_seconds',
+                histogram,
+                method=method,
+                route=route,
+            )
+        )
+
+    lines += [
+        '# HELP http_responses_total Responses by route and status code.',
+        '# TYPE http_responses_total counter',
+    ]
+    for (method, route, status), count in request_metrics.responses.items():
+        labels = _labels(method=method, route=route, status=status)
+        lines.append(f'http_responses_total{labels} {count}')
+
+    lines += [
+        '# HELP http_requests_in_flight Requests currently being served.',
+        '# TYPE http_requests_in_flight gauge',
+        f'http_requests_in_flight {request_metrics.in_flight}',
+        '# HELP db_statement_duration_seconds SQL statement latency by verb.',
+        '# TYPE db_statement_duration_seconds histogram',
+    ]
+    for verb, histogram in statement_metrics.durations.items():
+        lines.extend(
+            _histogram_lines(
+                'db_statement_duration_seconds', histogram, verb=verb
+            )
+        )
+
+    lines += [
+        '# HELP db_pool_checkout_wait_seconds Time spent waiting for a '
+        'pooled connection.',
+        '# TYPE db_pool_checkout_wait_seconds histogram',
+        *_histogram_lines(
+            'db_pool_checkout_wait_seconds', pool_metrics.checkout_wait
+        ),
+    ]
+
+    return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
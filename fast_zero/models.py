@@ -1,12 +1,33 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import (
+    ForeignKey,
+    Index,
+    String,
+    column,
+    func,
+    literal,
+    literal_column,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
 
+def search_document(title, description):
+    # Literal config and separator keep queries identical to the
+    # ix_todos_search expression, so Postgres can use the GIN index
+    return func.to_tsvector(
+        literal_column("'simple'"), title + literal_column("' '") + description
+    )
+
+
+def last_change(updated_at, created_at):
+    return func.coalesce(updated_at, created_at)
+
+
 class TodoState(str, Enum):
     draft = 'draft'
     todo = 'todo'
@@ -18,6 +39,8 @@ class TodoState(str, Enum):
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    __table_args__ = (Index('ix_users_created_at_id', 'created_at', 'id'),)
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
@@ -27,17 +50,49 @@ class User:
         init=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        init=False, nullable=True, onupdate=func.now()
+        init=False, nullable=True, default=None, onupdate=func.now()
     )
 
     todos: Mapped[list['Todo']] = relationship(
-        init=False, back_populates='user', cascade='all, delete-orphan'
+        init=False,
+        back_populates='user',
+        cascade='all, delete-orphan',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        Index('ix_todos_user_id_state', 'user_id', 'state'),
+        Index(
+            'ix_todos_user_id_created_at_id',
+            'user_id',
+            'created_at',
+            'id',
+            postgresql_where=text("state <> 'trash'"),
+        ),
+        Index(
+            'ix_todos_user_id_changed_at_id',
+            'user_id',
+            last_change(column('updated_at'), column('created_at')),
+            'id',
+        ),
+        Index(
+            'ix_todos_trashed_at',
+            last_change(column('updated_at'), column('created_at')),
+            postgresql_where=text("state = 'trash'"),
+        ),
+        Index(
+            'ix_todos_search',
+            search_document(
+                column('title', String), column('description', String)
+            ),
+            postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+    )
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
@@ -47,9 +102,51 @@ class Todo:
         init=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        init=False, nullable=True, onupdate=func.now()
+        init=False, nullable=True, default=None, onupdate=func.now()
     )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
 
     user: Mapped[User] = relationship(init=False, back_populates='todos')
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class TodoListVersion:
+    __tablename__ = 'todo_list_versions'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class RevokedToken:
+    __tablename__ = 'revoked_tokens'
+
+    jti: Mapped[str] = mapped_column(primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+    revoked_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+def is_trash():
+    # Rendered as a literal rather than a bound parameter so that Postgres
+    # can match the WHERE clause of the partial indexes on todos
+    return Todo.state == literal(
+        TodoState.trash, Todo.state.type, literal_execute=True
+    )
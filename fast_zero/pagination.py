@@ -0,0 +1,47 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+
+def page_size(limit: int):
+    return max(1, min(limit, settings.MAX_PAGE_SIZE))
+
+
+def encode_cursor(created_at: datetime, last_id: int):
+    raw = f'{created_at.isoformat()}|{last_id}'
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = urlsafe_b64decode(cursor.encode()).decode()
+        created_at, last_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(last_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+
+
+def paginate(query, model, cursor: str | None, limit: int):
+    if cursor:
+        query = query.where(
+            tuple_(model.created_at, model.id) > decode_cursor(cursor)
+        )
+
+    return query.order_by(model.created_at, model.id).limit(limit + 1)
+
+
+def next_page(rows, limit: int):
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.counters import adjust_counters, bump_list_versions
+from fast_zero.models import Todo, TodoState, is_trash, last_change
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_trash(
+    session: AsyncSession, older_than: datetime, batch_size: int
+):
+    trashed = (
+        select(Todo.id)
+        .where(
+            is_trash(),
+            last_change(Todo.updated_at, Todo.created_at) < older_than,
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    purged = 0
+
+    # One short transaction per batch, so a large cleanup never holds row
+    # locks for long and concurrent purges skip each other's rows
+    while True:
+        owners = await session.scalars(
+            delete(Todo)
+            .where(Todo.id.in_(trashed))
+            .returning(Todo.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        owners = owners.all()
+
+        deltas = Counter()
+        deltas.subtract((user_id, TodoState.trash) for user_id in owners)
+        await adjust_counters(session, deltas)
+        await bump_list_versions(session, owners)
+        await session.commit()
+        purged += len(owners)
+
+        if len(owners) < batch_size:
+            return purged
+
+
+async def purge_trash_forever(
+    engine, interval: float, retention: timedelta, batch_size: int
+):
+    while True:
+        await asyncio.sleep(interval)
+
+        older_than = datetime.now(timezone.utc).replace(tzinfo=None)
+        try:
+            async with AsyncSession(engine) as session:
+                purged = await purge_trash(
+                    session, older_than - retention, batch_size
+                )
+        except (OSError, SQLAlchemyError):
+            logger.exception('Trash purge failed')
+            continue
+
+        if purged:
+            logger.info('Purged %d trashed todos', purged)
@@ -0,0 +1,62 @@
+from itertools import count
+from time import monotonic
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.limits import client_key
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class ReplicaSet:
+    def __init__(self, engines, retry_after: float):
+        self.engines = engines
+        self.retry_after = retry_after
+        self.down_until = {}
+        self._turn = count()
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def candidates(self):
+        if not self.engines:
+            return
+
+        now = monotonic()
+        start = next(self._turn)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            if self.down_until.get(engine, 0) <= now:
+                yield engine
+
+    def mark_down(self, engine):
+        self.down_until[engine] = monotonic() + self.retry_after
+
+    async def connect(self):
+        # Unhealthy replicas are skipped until retry_after has passed, then
+        # the next request tries them again
+        for engine in self.candidates():
+            session = AsyncSession(engine, expire_on_commit=False)
+            try:
+                await session.connection()
+            except (OSError, DBAPIError):
+                await session.close()
+                self.mark_down(engine)
+                continue
+
+            self.down_until.pop(engine, None)
+            return session
+
+        return None
+
+
+class ReadYourWrites:
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def mark(self, request):
+        await self.cache.set(client_key(request), b'1')
+
+    async def active(self, request):
+        return await self.cache.get(client_key(request)) is not None
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RevocationList:
+    def __init__(self):
+        self._revoked = {}
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, jti: str, expires_at: datetime):
+        self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: str | None):
+        return jti is not None and jti in self._revoked
+
+    async def sync(self, session: AsyncSession):
+        now = utcnow()
+        await session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= now)
+        )
+        await session.commit()
+
+        revoked = await session.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.expires_at > now
+            )
+        )
+
+        # Revocations are never undone, so merging keeps tokens revoked
+        # locally while this query ran; only expired entries are dropped
+        merged = {**self._revoked, **dict(revoked.all())}
+        self._revoked = {
+            jti: expires_at
+            for jti, expires_at in merged.items()
+            if expires_at > now
+        }
+
+    async def sync_forever(self, engine, interval: float):
+        while True:
+            try:
+                async with AsyncSession(engine) as session:
+                    await self.sync(session)
+            except (OSError, SQLAlchemyError):
+                logger.exception('Token revocation sync failed')
+
+            await asyncio.sleep(interval)
+
+    def clear(self):
+        self._revoked.clear()
+
+
+revocation_list = RevocationList()
@@ -1,30 +1,44 @@
+from datetime import datetime, timezone
 from http import HTTPStatus
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from fast_zero.counters import UPSERTS
 from fast_zero.database import get_session
-from fast_zero.models import User
-from fast_zero.schemas import Token
+from fast_zero.limits import auth_rate_limiter
+from fast_zero.models import RevokedToken, User
+from fast_zero.revocation import revocation_list
+from fast_zero.schemas import Message, Token
 from fast_zero.security import (
     create_access_token,
     get_current_user,
+    hashing_pool,
+    oauth2_scheme,
     verify_password,
 )
+from fast_zero.tokens import token_verifier
 
 T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
-T_Session = Annotated[Session, Depends(get_session)]
-router = APIRouter(prefix='/auth', tags=['Auth'])
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_Token = Annotated[str, Depends(oauth2_scheme)]
+router = APIRouter(
+    prefix='/auth', tags=['Auth'], dependencies=[Depends(auth_rate_limiter)]
+)
 
 
 @router.post('/token/', response_model=Token)
-def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
-    user = session.scalar(select(User).where(User.email == form_data.username))
+async def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username)
+    )
 
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await hashing_pool.run(
+        verify_password, form_data.password, user.password
+    ):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password',
@@ -36,7 +50,41 @@ def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
 
 
 @router.post('/refresh_token', response_model=Token)
-def refresh_access_token(user: User = Depends(get_current_user)):
+async def refresh_access_token(user: User = Depends(get_current_user)):
     new_access_token = create_access_token(data={'sub': user.email})
 
     return {'access_token': new_access_token, 'token_type': 'bearer'}
+
+
+@router.post('/logout', response_model=Message)
+async def revoke_access_token(
+    session: T_Session,
+    token: T_Token,
+    user: User = Depends(get_current_user),
+):
+    claims = token_verifier.verify(token)
+    if 'jti' not in claims:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Token cannot be revoked',
+        )
+
+    expires_at = datetime.fromtimestamp(claims['exp'], timezone.utc).replace(
+        tzinfo=None
+    )
+    # Another worker may have revoked the same token concurrently
+    insert = UPSERTS[session.bind.dialect.name](RevokedToken).values(
+        jti=claims['jti'], expires_at=expires_at
+    )
+    await session.execute(
+        insert.on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+    )
+    await session.commit()
+    revocation_list.add(claims['jti'], expires_at)
+
+    return {'message': 'Token revoked'}
+
+
+@router.get('/jwks')
+async def read_jwks():
+    return token_verifier.jwks()
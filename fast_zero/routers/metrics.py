@@ -0,0 +1,52 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from fast_zero.database import pool_metrics, statement_metrics
+from fast_zero.events import broker
+from fast_zero.limits import load_shedder, rate_limiters
+from fast_zero.metrics import render_prometheus, request_metrics
+from fast_zero.routers.todos import response_cache
+from fast_zero.schemas import CacheStats, EventStats, LimitStats, PoolStats
+from fast_zero.security import user_cache
+
+router = APIRouter(prefix='/metrics', tags=['Metrics'])
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@router.get('', response_class=PlainTextResponse)
+async def read_metrics():
+    return PlainTextResponse(
+        render_prometheus(request_metrics, statement_metrics, pool_metrics),
+        media_type=PROMETHEUS_MEDIA_TYPE,
+    )
+
+
+@router.get('/pool', response_model=PoolStats)
+async def read_pool_stats():
+    return pool_metrics.snapshot()
+
+
+@router.get('/user_cache', response_model=CacheStats)
+async def read_user_cache_stats():
+    return user_cache.stats()
+
+
+@router.get('/response_cache', response_model=CacheStats)
+async def read_response_cache_stats():
+    return response_cache.stats()
+
+
+@router.get('/limits', response_model=LimitStats)
+async def read_limit_stats():
+    return {
+        **load_shedder.stats(),
+        'rate_limiters': {
+            limiter.name: limiter.stats() for limiter in rate_limiters
+        },
+    }
+
+
+@router.get('/events', response_model=EventStats)
+async def read_event_stats():
+    return broker.stats()
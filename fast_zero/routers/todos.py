@@ -1,30 +1,66 @@
+from collections import Counter
+from datetime import datetime
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi.exceptions import HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
-from fast_zero.models import Todo, TodoState, User
+from fast_zero.cache import Cache, cache_backend
+from fast_zero.counters import (
+    adjust_counters,
+    bump_list_versions,
+    read_counters,
+    read_list_version,
+    state_changes,
+)
+from fast_zero.database import get_read_session, get_session
+from fast_zero.etag import etag_matches, make_etag, not_modified
+from fast_zero.events import broker, event_stream, publish
+from fast_zero.export import MEDIA_TYPES, ExportFormat, stream_export
+from fast_zero.limits import todos_rate_limiter
+from fast_zero.models import Todo, TodoState, User, is_trash, last_change
+from fast_zero.pagination import next_page, page_size, paginate
 from fast_zero.schemas import (
     Message,
+    TodoBatch,
+    TodoBatchPatch,
+    TodoBatchResult,
+    TodoChanges,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
+from fast_zero.search import search_todos
 from fast_zero.security import get_current_user
+from fast_zero.serialization import (
+    TODO_COLUMNS,
+    encode_todo_list,
+    json_response,
+)
+from fast_zero.settings import Settings
+from fast_zero.sync import changed_since, split_changes, watermark
 
-router = APIRouter(prefix='/todos', tags=['ToDos'])
+router = APIRouter(
+    prefix='/todos', tags=['ToDos'], dependencies=[Depends(todos_rate_limiter)]
+)
+settings = Settings()
+response_cache = Cache(
+    cache_backend, 'todos:', settings.RESPONSE_CACHE_TTL_SECONDS
+)
 
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 T_User = Annotated[User, Depends(get_current_user)]
 
 
 @router.post('/', response_model=TodoPublic)
-def create_todo(
+async def create_todo(
     todo: TodoSchema,
     user: T_User,
     session: T_Session,
@@ -36,23 +72,148 @@ def create_todo(
         user_id=user.id,
     )
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    await adjust_counters(session, Counter({(user.id, todo.state): 1}))
+    await bump_list_versions(session, [user.id])
+    await session.commit()
+    await publish(user.id, 'created', [db_todo.id])
 
     return db_todo
 
 
-@router.get('/', response_model=TodoList)
-def list(  # noqa
+# Batch routes must be registered before /{todo_id} so that "batch" is not
+# parsed as a todo id
+@router.post('/batch', response_model=TodoList)
+async def create_todos(batch: TodoBatch, user: T_User, session: T_Session):
+    todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), 'user_id': user.id} for todo in batch.todos],
+    )
+    todos = todos.all()
+    await adjust_counters(
+        session, Counter((user.id, todo.state) for todo in batch.todos)
+    )
+    await bump_list_versions(session, [user.id])
+    await session.commit()
+    await publish(user.id, 'created', [todo.id for todo in todos])
+
+    return {'todos': todos}
+
+
+@router.patch('/batch', response_model=TodoBatchResult)
+async def patch_todos(batch: TodoBatchPatch, user: T_User, session: T_Session):
+    owned = await session.execute(
+        select(Todo.id, Todo.state)
+        .where(
+            Todo.user_id == user.id,
+            Todo.id.in_([todo.id for todo in batch.todos]),
+            ~is_trash(),
+        )
+        .with_for_update()
+    )
+    owned = dict(owned.all())
+
+    changes = [
+        todo.model_dump(exclude_unset=True)
+        for todo in batch.todos
+        if todo.id in owned
+    ]
+    changes = [change for change in changes if len(change) > 1]
+
+    deltas = Counter()
+    for change in changes:
+        if change.get('state'):
+            deltas.update(
+                state_changes(user.id, owned[change['id']], change['state'])
+            )
+            owned[change['id']] = change['state']
+
+    if changes:
+        await session.execute(update(Todo), changes)
+        await adjust_counters(session, deltas)
+        await bump_list_versions(session, [user.id])
+    await session.commit()
+    if changes:
+        await publish(user.id, 'updated', [change['id'] for change in changes])
+
+    return {
+        'results': [
+            {
+                'id': todo.id,
+                'status': 'updated' if todo.id in owned else 'not_found',
+            }
+            for todo in batch.todos
+        ]
+    }
+
+
+@router.delete('/batch', response_model=TodoBatchResult)
+async def delete_todos(
+    user: T_User,
     session: T_Session,
+    ids: Annotated[list[int], Query(min_length=1, max_length=500)],
+):
+    deleted = await session.execute(
+        select(Todo.id, Todo.state)
+        .where(Todo.user_id == user.id, Todo.id.in_(ids), ~is_trash())
+        .with_for_update()
+    )
+    deleted = dict(deleted.all())
+
+    if deleted:
+        await session.execute(
+            update(Todo)
+            .where(Todo.id.in_(deleted))
+            .values(state=TodoState.trash)
+        )
+
+        deltas = Counter({(user.id, TodoState.trash): len(deleted)})
+        deltas.subtract((user.id, state) for state in deleted.values())
+        await adjust_counters(session, deltas)
+        await bump_list_versions(session, [user.id])
+
+    await session.commit()
+    if deleted:
+        await publish(user.id, 'deleted', deleted)
+
+    return {
+        'results': [
+            {
+                'id': todo_id,
+                'status': 'deleted' if todo_id in deleted else 'not_found',
+            }
+            for todo_id in ids
+        ]
+    }
+
+
+@router.get('/', response_model=TodoList)
+async def list(  # noqa
+    request: Request,
+    response: Response,
+    session: T_ReadSession,
     user: T_User,
     title: str | None = None,
     description: str | None = None,
     state: TodoState | None = None,
-    offset: int | None = None,
-    limit: int | None = None,
+    q: str | None = None,
+    cursor: str | None = None,
+    limit: int = 10,
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    # Every todo write bumps the user's list version in its transaction, so
+    # the ETag can be checked with a single-row read
+    version = await read_list_version(session, user.id)
+    etag = make_etag('todos', user.id, version, request.url.query)
+
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    content = await response_cache.get(etag)
+    if content is not None:
+        return json_response(content, headers={'ETag': etag})
+
+    query = select(*TODO_COLUMNS, Todo.created_at).where(
+        Todo.user_id == user.id
+    )
 
     if title:
         query = query.filter(Todo.title.contains(title))
@@ -60,34 +221,137 @@ def list(  # noqa
     if description:
         query = query.filter(Todo.description.contains(description))
 
+    # Trash is only listed when asked for, which also lets Postgres use the
+    # partial ix_todos_user_id_created_at_id index for default listings
     if state:
         query = query.filter(Todo.state == state)
+    else:
+        query = query.filter(~is_trash())
 
-    todos = session.scalars(query.offset(offset).limit(limit)).all()
+    limit = page_size(limit)
 
-    return {'todos': todos}
+    if q:
+        # Ranked results are a single page, so next_page yields no cursor
+        dialect = session.bind.dialect.name
+        query = search_todos(query, q, dialect).limit(limit)
+    else:
+        query = paginate(query, Todo, cursor, limit)
+
+    todos = await session.execute(query)
+    todos, next_cursor = next_page(todos.all(), limit)
+
+    if settings.FAST_JSON_RESPONSES or response_cache.enabled:
+        content = encode_todo_list(todos, next_cursor)
+        await response_cache.set(etag, content)
+
+        return json_response(content, headers={'ETag': etag})
+
+    response.headers['ETag'] = etag
+
+    return {'todos': todos, 'next_cursor': next_cursor}
+
+
+@router.get('/stats', response_model=TodoStats)
+async def read_stats(session: T_Session, user: T_User):
+    return await read_counters(session, user.id)
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def read_changes(
+    session: T_Session,
+    user: T_User,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = settings.MAX_PAGE_SIZE,
+):
+    mark = watermark(since, cursor)
+    limit = page_size(limit)
+
+    query = select(
+        *TODO_COLUMNS,
+        Todo.created_at,
+        last_change(Todo.updated_at, Todo.created_at).label('changed_at'),
+    ).where(Todo.user_id == user.id)
+
+    todos = await session.execute(
+        changed_since(query, mark, limit, session.bind.dialect.name)
+    )
+
+    return split_changes(todos.all(), mark, limit)
+
+
+@router.get('/events')
+async def stream_events(user: T_User):
+    return StreamingResponse(
+        event_stream(broker, user.id, settings.EVENTS_HEARTBEAT_SECONDS),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get('/export')
+async def export_todos(
+    session: T_Session,
+    user: T_User,
+    export_format: Annotated[
+        ExportFormat, Query(alias='format')
+    ] = ExportFormat.ndjson,
+):
+    query = (
+        select(*TODO_COLUMNS)
+        .where(Todo.user_id == user.id, ~is_trash())
+        .order_by(Todo.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+
+    return StreamingResponse(
+        stream_export(session.bind, query, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="todos.{export_format.value}"'
+            )
+        },
+    )
 
 
 @router.get('/{todo_id}', response_model=TodoPublic)
-def get_by_id(todo_id: int, session: T_Session, user: T_User):
-    todo = session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+async def get_by_id(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    session: T_ReadSession,
+    user: T_User,
+):
+    todo = await session.execute(
+        select(*TODO_COLUMNS, Todo.created_at, Todo.updated_at).where(
+            Todo.user_id == user.id, Todo.id == todo_id, ~is_trash()
+        )
     )
+    todo = todo.first()
 
     if not todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
+    etag = make_etag('todo', todo.id, todo.updated_at or todo.created_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers['ETag'] = etag
+
     return todo
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
-def patch_todo(
+async def patch_todo(
     todo_id: int, session: T_Session, user: T_User, todo: TodoUpdate
 ):
-    db_todo = session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+    db_todo = await session.scalar(
+        select(Todo)
+        .where(Todo.user_id == user.id, Todo.id == todo_id, ~is_trash())
+        .with_for_update()
     )
 
     if not db_todo:
@@ -95,28 +359,43 @@ def patch_todo(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
+    state = db_todo.state
     for key, value in todo.model_dump(exclude_unset=True).items():
         setattr(db_todo, key, value)
 
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    await adjust_counters(
+        session, state_changes(user.id, state, db_todo.state)
+    )
+    await bump_list_versions(session, [user.id])
+    await session.commit()
+    await publish(user.id, 'updated', [todo_id])
 
     return db_todo
 
 
 @router.delete('/{todo_id}', response_model=Message)
-def delete(todo_id: int, session: T_Session, user: T_User):
-    todo = session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+async def delete(todo_id: int, session: T_Session, user: T_User):
+    state = await session.scalar(
+        select(Todo.state)
+        .where(Todo.user_id == user.id, Todo.id == todo_id, ~is_trash())
+        .with_for_update()
     )
 
-    if not todo:
+    if state is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    session.delete(todo)
-    session.commit()
+    # Deleting moves the todo to the trash; purge_trash removes it for good
+    await session.execute(
+        update(Todo).where(Todo.id == todo_id).values(state=TodoState.trash)
+    )
+    await adjust_counters(
+        session, state_changes(user.id, state, TodoState.trash)
+    )
+    await bump_list_versions(session, [user.id])
+    await session.commit()
+    await publish(user.id, 'deleted', [todo_id])
 
     return {'message': 'Task has been deleted successfully.'}
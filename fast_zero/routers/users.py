@@ -1,32 +1,56 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
+from fast_zero.database import get_read_session, get_session
+from fast_zero.etag import etag_matches, make_etag, not_modified
 from fast_zero.models import User
+from fast_zero.pagination import next_page, page_size, paginate
 from fast_zero.schemas import Message, UserList, UserPublic, UserSchema
-from fast_zero.security import get_current_user, get_password_hash
-
-T_Session = Annotated[Session, Depends(get_session)]
+from fast_zero.security import (
+    get_current_user,
+    get_password_hash,
+    hashing_pool,
+    user_cache,
+)
+from fast_zero.serialization import (
+    USER_COLUMNS,
+    encode_user_list,
+    json_response,
+)
+from fast_zero.settings import Settings
+
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 T_Current_User = Annotated[User, Depends(get_current_user)]
 router = APIRouter(prefix='/users', tags=['Users'])
+settings = Settings()
 
 
 @router.get('/', response_model=UserList)
-def read_users(session: T_Session, limit: int = 10, skip: int = 0):
-    users = session.scalars(select(User).offset(skip).limit(limit))
-    return {'users': users}
+async def read_users(
+    session: T_ReadSession, cursor: str | None = None, limit: int = 10
+):
+    limit = page_size(limit)
+    query = select(*USER_COLUMNS, User.created_at)
+    users = await session.execute(paginate(query, User, cursor, limit))
+    users, next_cursor = next_page(users.all(), limit)
+
+    if settings.FAST_JSON_RESPONSES:
+        return json_response(encode_user_list(users, next_cursor))
+
+    return {'users': users, 'next_cursor': next_cursor}
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-def create_user(
+async def create_user(
     user: UserSchema,
     session: T_Session,
 ):
-    db_user = session.scalar(
+    db_user = await session.scalar(
         select(User).where(
             (User.username == user.username) | (User.email == user.email)
         )
@@ -46,30 +70,47 @@ def create_user(
 
     db_user = User(
         username=user.username,
-        password=get_password_hash(user.password),
+        password=await hashing_pool.run(get_password_hash, user.password),
         email=user.email,
     )
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
 
     return db_user
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-def get_user(user_id: int, session: T_Session):
-    db_user = session.scalar(select(User).where(User.id == user_id))
+async def get_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    session: T_ReadSession,
+):
+    db_user = await session.execute(
+        select(*USER_COLUMNS, User.created_at, User.updated_at).where(
+            User.id == user_id
+        )
+    )
+    db_user = db_user.first()
 
     if not db_user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
 
+    etag = make_etag(
+        'user', db_user.id, db_user.updated_at or db_user.created_at
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers['ETag'] = etag
+
     return db_user
 
 
 @router.put('/{user_id}', response_model=UserPublic)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -79,18 +120,22 @@ def update_user(
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
+
+    cache_key = current_user.email
     current_user.username = user.username
     current_user.email = user.email
-    current_user.password = get_password_hash(user.password)
+    current_user.password = await hashing_pool.run(
+        get_password_hash, user.password
+    )
 
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    await user_cache.delete(cache_key)
 
     return current_user
 
 
 @router.delete('/{user_id}', response_model=Message)
-def delete_user(
+async def delete_user(
     user_id: int,
     session: T_Session,
     current_user: T_Current_User,
@@ -100,7 +145,8 @@ def delete_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
 
-    session.delete(current_user)
-    session.commit()
+    await session.delete(current_user)
+    await session.commit()
+    await user_cache.delete(current_user.email)
 
     return {'message': 'User deleted'}
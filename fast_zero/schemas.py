@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from fast_zero.models import TodoState
 
@@ -26,6 +26,7 @@ class UserDB(UserSchema):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -45,13 +46,89 @@ class TodoSchema(BaseModel):
 
 class TodoPublic(TodoSchema):
     id: int
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
 
 
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoBatch(BaseModel):
+    todos: list[TodoSchema] = Field(min_length=1, max_length=500)
+
+
+class TodoBatchUpdate(TodoUpdate):
+    id: int
+
+
+class TodoBatchPatch(BaseModel):
+    todos: list[TodoBatchUpdate] = Field(min_length=1, max_length=500)
+
+
+class TodoBatchItem(BaseModel):
+    id: int
+    status: str
+
+
+class TodoBatchResult(BaseModel):
+    results: list[TodoBatchItem]
+
+
+class TodoChanges(BaseModel):
+    created: list[TodoPublic]
+    updated: list[TodoPublic]
+    deleted: list[int]
+    next_cursor: str | None
+    has_more: bool
+    pending: bool
+
+
+class TodoStats(BaseModel):
+    states: dict[TodoState, int]
+    active: int
+
+
+class HistogramSnapshot(BaseModel):
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStats(BaseModel):
+    size: int | None
+    checked_out: int | None
+    overflow: int | None
+    checkouts: int
+    overflow_events: int
+    checkout_wait: HistogramSnapshot
+
+
+class CacheStats(BaseModel):
+    backend: str
+    hits: int
+    misses: int
+
+
+class EventStats(BaseModel):
+    backend: str
+    subscribers: int
+    dropped: int
+
+
+class RateLimiterStats(BaseModel):
+    allowed: int
+    rejected: int
+
+
+class LimitStats(BaseModel):
+    in_flight: int
+    max_in_flight: int
+    shed: int
+    rate_limiters: dict[str, RateLimiterStats]
@@ -0,0 +1,17 @@
+from sqlalchemy import func, or_
+
+from fast_zero.models import Todo, search_document
+
+
+def search_todos(query, q: str, dialect: str):
+    if dialect != 'postgresql':
+        return query.where(
+            or_(Todo.title.contains(q), Todo.description.contains(q))
+        )
+
+    document = search_document(Todo.title, Todo.description)
+    ts_query = func.websearch_to_tsquery('simple', q)
+
+    return query.where(document.op('@@')(ts_query)).order_by(
+        func.ts_rank(document, ts_query).desc(), Todo.id
+    )
@@ -1,24 +1,59 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from http import HTTPStatus
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import DecodeError, ExpiredSignatureError, decode, encode
+from jwt import DecodeError, ExpiredSignatureError
 from pwdlib import PasswordHash
 from sqlalchemy import select
-from sqlalchemy.orm import Session
-from zoneinfo import ZoneInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
-from fast_zero.database import get_session
+from fast_zero.cache import Cache, cache_backend
+from fast_zero.database import get_read_session
 from fast_zero.models import User
-from fast_zero.schemas import TokenData
+from fast_zero.revocation import revocation_list
 from fast_zero.settings import Settings
+from fast_zero.tokens import token_verifier
 
 settings = Settings()
 
 
 pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+user_cache = Cache(cache_backend, 'user:', settings.USER_CACHE_TTL_SECONDS)
+
+
+class HashingPool:
+    def __init__(self, max_workers: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='password-hash'
+        )
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Server is busy, try again later',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+
+hashing_pool = HashingPool(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
 
 
 def get_password_hash(password: str):
@@ -29,24 +64,15 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: dict):
-    to_encode = data.copy()
-
-    expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    )
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({'exp': expire})
 
-    enconde_jwt = encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
-
-    return enconde_jwt
+def create_access_token(data: dict):
+    return token_verifier.create(data, ACCESS_TOKEN_EXPIRE)
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
+async def get_current_user(
+    session: AsyncSession = Depends(get_read_session),
     token: str = Depends(oauth2_scheme),
 ):
     credentials_exception = HTTPException(
@@ -56,24 +82,56 @@ def get_current_user(
     )
 
     try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-
-        username: str = payload.get('sub')
-        if not username:
-            raise credentials_exception
-        token_data = TokenData(username=username)
+        payload = token_verifier.verify(token)
     except DecodeError:
         raise credentials_exception
     except ExpiredSignatureError:
         raise credentials_exception
 
-    user = session.scalar(
-        select(User).where(User.email == token_data.username)
-    )
+    username = payload.get('sub')
+    if not username or revocation_list.is_revoked(payload.get('jti')):
+        raise credentials_exception
+
+    cached = await user_cache.get(username)
+    if cached:
+        user = await session.merge(load_user(cached), load=False)
+        # The cache leaves out the password hash, so the placeholder from
+        # load_user is expired and loaded again if a handler reads it
+        session.expire(user, ['password'])
+        return user
+
+    user = await session.scalar(select(User).where(User.email == username))
 
     if user is None:
         raise credentials_exception
 
+    await user_cache.set(username, dump_user(user))
+
+    return user
+
+
+def dump_user(user: User):
+    return json.dumps({
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'created_at': user.created_at.isoformat(),
+        'updated_at': user.updated_at and user.updated_at.isoformat(),
+    }).encode()
+
+
+def load_user(cached: bytes):
+    data = json.loads(cached)
+    user = User(
+        username=data['username'],
+        password='',
+        email=data['email'],
+    )
+    user.id = data['id']
+    user.created_at = datetime.fromisoformat(data['created_at'])
+    user.updated_at = data['updated_at'] and datetime.fromisoformat(
+        data['updated_at']
+    )
+    make_transient_to_detached(user)
+
     return user
@@ -0,0 +1,54 @@
+from typing import TypedDict
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from fast_zero.models import Todo, TodoState, User
+
+TODO_COLUMNS = (Todo.id, Todo.title, Todo.description, Todo.state)
+USER_COLUMNS = (User.id, User.username, User.email)
+
+
+class TodoRow(TypedDict):
+    id: int
+    title: str
+    description: str
+    state: TodoState
+
+
+class TodoListRows(TypedDict):
+    todos: list[TodoRow]
+    next_cursor: str | None
+
+
+class UserRow(TypedDict):
+    id: int
+    username: str
+    email: str
+
+
+class UserListRows(TypedDict):
+    users: list[UserRow]
+    next_cursor: str | None
+
+
+todo_list_adapter = TypeAdapter(TodoListRows)
+user_list_adapter = TypeAdapter(UserListRows)
+
+
+def encode_todo_list(rows, next_cursor: str | None):
+    return todo_list_adapter.dump_json({
+        'todos': [row._asdict() for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+def encode_user_list(rows, next_cursor: str | None):
+    return user_list_adapter.dump_json({
+        'users': [row._asdict() for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+def json_response(content: bytes, headers: dict | None = None):
+    return Response(content, media_type='application/json', headers=headers)
@@ -10,3 +10,58 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+
+    CACHE_URL: str = 'memory://'
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_POOL_SIZE: int = 10
+    CACHE_TIMEOUT_SECONDS: float = 1
+    CACHE_RETRY_SECONDS: float = 5
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    MAX_PAGE_SIZE: int = 100
+
+    EXPORT_BATCH_SIZE: int = 1000
+
+    FAST_JSON_RESPONSES: bool = False
+
+    RESPONSE_CACHE_TTL_SECONDS: int = 0
+
+    AUTH_RATE_LIMIT_PER_MINUTE: int = 20
+    AUTH_RATE_LIMIT_BURST: int = 10
+    TODOS_RATE_LIMIT_PER_MINUTE: int = 600
+    TODOS_RATE_LIMIT_BURST: int = 100
+    MAX_IN_FLIGHT_REQUESTS: int = 512
+
+    QUERY_DIAGNOSTICS: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    N_PLUS_ONE_THRESHOLD: int = 5
+    STATEMENT_BUDGET: int = 0
+
+    TRASH_RETENTION_DAYS: int = 30
+    TRASH_PURGE_BATCH_SIZE: int = 1000
+    TRASH_PURGE_INTERVAL_SECONDS: int = 3600
+
+    CHANGES_SAFETY_LAG_SECONDS: float = 5
+
+    EVENTS_BACKEND: str = 'memory'
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: float = 15
+
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_RETRY_SECONDS: float = 30
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    JWT_PRIVATE_KEY: str | None = None
+    JWT_PUBLIC_KEY: str | None = None
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 30
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import column, func, select, table, tuple_
+
+from fast_zero.models import Todo, TodoState, last_change
+from fast_zero.pagination import decode_cursor, encode_cursor
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+
+def _utc(value: datetime):
+    if value.tzinfo is None:
+        return value
+
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def watermark(since: datetime | None, cursor: str | None):
+    if cursor:
+        changed_at, last_id = decode_cursor(cursor)
+    elif since:
+        changed_at, last_id = since, 0
+    else:
+        return None
+
+    changed_at = _utc(changed_at)
+
+    # Trash rows are the tombstones of deleted todos; once purged, clients
+    # older than the retention window cannot learn about those deletes
+    retention = timedelta(days=settings.TRASH_RETENTION_DAYS)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if settings.TRASH_PURGE_INTERVAL_SECONDS and changed_at < now - retention:
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Changes are no longer available, run a full sync',
+        )
+
+    return changed_at, last_id
+
+
+def horizon(dialect: str):
+    # Rows are stamped with the start time of the transaction that wrote
+    # them but only become visible when it commits, so a change older than
+    # the newest one returned can still show up later. Changes from before
+    # the oldest running client transaction are final. The hold-back is
+    # capped at the safety lag so that one long transaction cannot stall
+    # every sync; other databases only use the lag
+    lag = timedelta(seconds=settings.CHANGES_SAFETY_LAG_SECONDS)
+    if dialect == 'postgresql':
+        oldest = (
+            select(func.min(column('xact_start')))
+            .select_from(table('pg_stat_activity'))
+            .where(
+                column('datname') == func.current_database(),
+                column('backend_type') == 'client backend',
+            )
+            .scalar_subquery()
+        )
+        return func.greatest(oldest, func.now() - lag)
+
+    return _utc(datetime.now(timezone.utc)) - lag
+
+
+# Clients must resume from the returned next_cursor, never from their own
+# clock or the newest timestamp they saw. When pending is true, changes
+# past the cursor are still settling: poll again with the same cursor
+# after CHANGES_SAFETY_LAG_SECONDS at the latest
+def changed_since(
+    query, mark: tuple[datetime, int] | None, limit: int, dialect: str
+):
+    changed_at = last_change(Todo.updated_at, Todo.created_at)
+    query = query.add_columns((changed_at < horizon(dialect)).label('settled'))
+    if mark:
+        query = query.where(tuple_(changed_at, Todo.id) > mark)
+
+    return query.order_by(changed_at, Todo.id).limit(limit + 1)
+
+
+def split_changes(rows, mark: tuple[datetime, int] | None, limit: int):
+    # Rows are ordered by change time, so the settled ones come first
+    settled = [row for row in rows if row.settled]
+    pending = len(settled) < len(rows)
+    rows = settled
+
+    changes = {'created': [], 'updated': [], 'deleted': []}
+    for row in rows[:limit]:
+        if row.state == TodoState.trash:
+            changes['deleted'].append(row.id)
+        elif mark is None or (row.created_at, row.id) > mark:
+            changes['created'].append(row)
+        else:
+            changes['updated'].append(row)
+
+    if rows:
+        last = rows[:limit][-1]
+        changes['next_cursor'] = encode_cursor(last.changed_at, last.id)
+    elif mark:
+        changes['next_cursor'] = encode_cursor(*mark)
+    else:
+        changes['next_cursor'] = None
+    changes['has_more'] = len(rows) > limit
+    changes['pending'] = pending
+
+    return changes
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timedelta, timezone
+from time import time
+from uuid import uuid4
+
+from jwt import decode, encode
+from jwt.algorithms import get_default_algorithms
+
+from fast_zero.cache import TTLCache
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+SYMMETRIC_ALGORITHMS = frozenset({'HS256', 'HS384', 'HS512'})
+
+
+class TokenVerifier:
+    def __init__(
+        self,
+        algorithm: str,
+        signing_key: str,
+        verification_key: str,
+        maxsize: int,
+    ):
+        # Parsing PEM keys is far more expensive than checking a signature,
+        # so keys are prepared once instead of on every encode/decode
+        implementation = get_default_algorithms()[algorithm]
+        self.algorithm = algorithm
+        self.implementation = implementation
+        self.signing_key = implementation.prepare_key(signing_key)
+        self.verification_key = implementation.prepare_key(verification_key)
+        self._claims = TTLCache(maxsize, ttl=0)
+
+    @property
+    def symmetric(self):
+        return self.algorithm in SYMMETRIC_ALGORITHMS
+
+    def create(self, data: dict, expires_in: timedelta):
+        expire = datetime.now(tz=timezone.utc) + expires_in
+        return encode(
+            {**data, 'exp': expire, 'jti': uuid4().hex},
+            self.signing_key,
+            algorithm=self.algorithm,
+        )
+
+    def verify(self, token: str):
+        claims = self._claims.get(token)
+        if claims is not None:
+            return claims
+
+        claims = decode(
+            token, self.verification_key, algorithms=[self.algorithm]
+        )
+
+        # A verified token stays valid until it expires, so the claims
+        # are remembered until then; tokens without exp are not cached
+        if 'exp' in claims:
+            self._claims.set(token, claims, ttl=claims['exp'] - time())
+
+        return claims
+
+    def clear(self):
+        self._claims.clear()
+
+    def jwks(self):
+        if self.symmetric:
+            return {'keys': []}
+
+        jwk = json.loads(self.implementation.to_jwk(self.verification_key))
+        return {'keys': [{**jwk, 'alg': self.algorithm, 'use': 'sig'}]}
+
+
+def create_verifier():
+    if settings.ALGORITHM not in get_default_algorithms():
+        raise RuntimeError(f'Unsupported ALGORITHM {settings.ALGORITHM}')
+
+    if settings.ALGORITHM in SYMMETRIC_ALGORITHMS:
+        signing_key = verification_key = settings.SECRET_KEY
+    else:
+        signing_key = settings.JWT_PRIVATE_KEY
+        verification_key = settings.JWT_PUBLIC_KEY
+
+    if not signing_key or not verification_key:
+        raise RuntimeError(
+            f'{settings.ALGORITHM} needs JWT_PRIVATE_KEY and JWT_PUBLIC_KEY'
+        )
+
+    return TokenVerifier(
+        settings.ALGORITHM,
+        signing_key,
+        verification_key,
+        settings.TOKEN_CACHE_MAX_ENTRIES,
+    )
+
+
+token_verifier = create_verifier()
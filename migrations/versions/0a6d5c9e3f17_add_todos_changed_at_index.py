@@ -0,0 +1,29 @@
+"""add todos changed_at index
+
+Revision ID: 0a6d5c9e3f17
+Revises: f1c8d3b5a402
+Create Date: 2026-10-18 17:04:22.906518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d5c9e3f17'
+down_revision: Union[str, None] = 'f1c8d3b5a402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_changed_at_id', 'todos', ['user_id', sa.text('coalesce(updated_at, created_at)'), 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_user_id_changed_at_id', table_name='todos', postgresql_concurrently=True)
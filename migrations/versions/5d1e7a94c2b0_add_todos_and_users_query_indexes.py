@@ -0,0 +1,33 @@
+"""add todos and users query indexes
+
+Revision ID: 5d1e7a94c2b0
+Revises: 3ff7cd9ca45f
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1e7a94c2b0'
+down_revision: Union[str, None] = '3ff7cd9ca45f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_state', 'todos', ['user_id', 'state'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_todos_user_id_created_at_id', 'todos', ['user_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_created_at_id', table_name='todos', postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_state', table_name='todos', postgresql_concurrently=True)
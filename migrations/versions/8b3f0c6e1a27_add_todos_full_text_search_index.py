@@ -0,0 +1,36 @@
+"""add todos full text search index
+
+Revision ID: 8b3f0c6e1a27
+Revises: 5d1e7a94c2b0
+Create Date: 2026-10-18 11:02:47.905114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3f0c6e1a27'
+down_revision: Union[str, None] = '5d1e7a94c2b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_todos_search',
+            'todos',
+            [sa.text("to_tsvector('simple', title || ' ' || description)")],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_search', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""cascade todos on user delete
+
+Revision ID: c4a9e2d7b631
+Revises: 8b3f0c6e1a27
+Create Date: 2026-10-18 14:21:09.318842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2d7b631'
+down_revision: Union[str, None] = '8b3f0c6e1a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NOT VALID skips the full-table check while holding the lock; the
+    # autocommit block commits the swap first, so the VALIDATE scan only
+    # holds a SHARE UPDATE EXCLUSIVE lock
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key(
+        'todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'],
+        ondelete='CASCADE', postgresql_not_valid=True,
+    )
+    with op.get_context().autocommit_block():
+        op.execute(sa.text('ALTER TABLE todos VALIDATE CONSTRAINT todos_user_id_fkey'))
+
+
+def downgrade() -> None:
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key('todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'])
@@ -0,0 +1,37 @@
+"""add todos trash partial indexes
+
+Revision ID: e7b2f4a9d813
+Revises: c4a9e2d7b631
+Create Date: 2026-10-18 15:02:41.774205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2f4a9d813'
+down_revision: Union[str, None] = 'c4a9e2d7b631'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block. The
+    # listing index is rebuilt under a temporary name and swapped in, so
+    # there is never a window without it
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_created_at_id_active', 'todos', ['user_id', 'created_at', 'id'], unique=False, postgresql_where=sa.text("state <> 'trash'"), postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_created_at_id', table_name='todos', postgresql_concurrently=True)
+        op.execute('ALTER INDEX ix_todos_user_id_created_at_id_active RENAME TO ix_todos_user_id_created_at_id')
+        op.create_index('ix_todos_trashed_at', 'todos', [sa.text('coalesce(updated_at, created_at)')], unique=False, postgresql_where=sa.text("state = 'trash'"), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_trashed_at', table_name='todos', postgresql_concurrently=True)
+        op.create_index('ix_todos_user_id_created_at_id_full', 'todos', ['user_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_created_at_id', table_name='todos', postgresql_concurrently=True)
+        op.execute('ALTER INDEX ix_todos_user_id_created_at_id_full RENAME TO ix_todos_user_id_created_at_id')
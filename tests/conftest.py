@@ -1,71 +1,120 @@
+from contextlib import contextmanager
+
 import factory
 import factory.fuzzy
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
-from fast_zero.app import app
-from fast_zero.database import get_session
+from fast_zero.app import app, settings
+from fast_zero.cache import cache_backend
+from fast_zero.database import (
+    get_read_session,
+    get_session,
+    query_diagnostics,
+)
+from fast_zero.limits import rate_limiters
+from fast_zero.metrics import request_metrics
 from fast_zero.models import Todo, TodoState, User, table_registry
-from fast_zero.security import get_password_hash
+from fast_zero.revocation import revocation_list
+from fast_zero.routers.todos import response_cache
+from fast_zero.security import get_password_hash, user_cache
 
 
 @pytest.fixture()
-def client(session):
+def client(session, monkeypatch):
     def get_session_override():
         return session
 
+    # The background tasks would run against DATABASE_URL, not the test
+    # database
+    monkeypatch.setattr(settings, 'TRASH_PURGE_INTERVAL_SECONDS', 0)
+    monkeypatch.setattr(settings, 'TOKEN_REVOCATION_SYNC_SECONDS', 0)
+
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_session_override
 
         yield client
 
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    yield
+    cache_backend.clear()
+    user_cache.clear_stats()
+    response_cache.clear_stats()
+    request_metrics.clear()
+    revocation_list.clear()
+    for limiter in rate_limiters:
+        limiter.clear()
+
+
+@pytest.fixture()
+def statement_budget(engine, monkeypatch):
+    query_diagnostics.instrument(engine)
+    monkeypatch.setattr(query_diagnostics, 'strict', True)
+
+    def set_budget(budget):
+        monkeypatch.setattr(query_diagnostics, 'budget', budget)
+
+    yield set_budget
+
+    for name, fn in (
+        ('before_cursor_execute', query_diagnostics._on_before),
+        ('after_cursor_execute', query_diagnostics._on_after),
+    ):
+        event.remove(engine.sync_engine, name, fn)
+
+
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
-        _engine = create_engine(postgres.get_connection_url())
+        _engine = create_async_engine(postgres.get_connection_url())
 
-        with _engine.begin():
-            yield _engine
+        yield _engine
 
 
-@pytest.fixture()
-def session(engine):
-    table_registry.metadata.create_all(engine)
+@pytest_asyncio.fixture()
+async def session(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
 
-    with Session(engine) as session:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
-        session.rollback()
-    table_registry.metadata.drop_all(engine)
+        await session.rollback()
 
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
 
-@pytest.fixture()
-def user(session):
+
+@pytest_asyncio.fixture()
+async def user(session):
     password = 'testtest'
     new_user = UserFactory(password=get_password_hash(password))
 
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    await session.refresh(new_user)
 
     new_user.clean_password = password
 
     return new_user
 
 
-@pytest.fixture()
-def other_user(session):
+@pytest_asyncio.fixture()
+async def other_user(session):
     password = 'testest'
     new_user = UserFactory(password=get_password_hash(password))
 
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    await session.refresh(new_user)
 
     new_user.clean_password = password
 
@@ -81,6 +130,24 @@ def token(client, user):
     return response.json()['access_token']
 
 
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    try:
+        yield statements
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+        )
+
+
 class UserFactory(factory.Factory):
     class Meta:
         model = User
@@ -96,5 +163,8 @@ class TodoFactory(factory.Factory):
 
     title = factory.Faker('text')
     description = factory.Faker('text')
-    state = factory.fuzzy.FuzzyChoice(TodoState)
+    # Trashed todos are hidden from default listings, so they are opt-in
+    state = factory.fuzzy.FuzzyChoice([
+        state for state in TodoState if state != TodoState.trash
+    ])
     user_id = 1
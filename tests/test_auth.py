@@ -2,6 +2,8 @@ from http import HTTPStatus
 
 from freezegun import freeze_time
 
+from fast_zero.security import hashing_pool
+
 
 def test_get_token(client, user):
     response = client.post(
@@ -95,3 +97,15 @@ def test_token_expired_dont_refresh(client, user):
         )
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_get_token_hashing_pool_saturated(client, user, monkeypatch):
+    monkeypatch.setattr(hashing_pool, 'max_pending', 0)
+
+    response = client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,153 @@
+import os
+import tracemalloc
+from http import HTTPStatus
+from time import perf_counter
+
+import pytest
+from sqlalchemy import insert, select
+
+from fast_zero.export import ExportFormat, stream_export
+from fast_zero.limits import todos_rate_limiter
+from fast_zero.models import Todo, TodoState
+from fast_zero.pagination import encode_cursor
+from fast_zero.serialization import TODO_COLUMNS
+
+# Opt-in: run with `task benchmark` (pytest -m benchmark). Sizes can be
+# lowered through the environment for a quick run
+pytestmark = pytest.mark.benchmark
+
+WRITE_COUNT = int(os.environ.get('BENCHMARK_WRITE_COUNT', 500))
+PAGE_SIZE = 10
+DEEP_PAGE = int(os.environ.get('BENCHMARK_DEEP_PAGE', 10_000))
+EXPORT_ROWS = int(os.environ.get('BENCHMARK_EXPORT_ROWS', 1_000_000))
+EXPORT_BATCH_SIZE = 1000
+SEED_CHUNK = 10_000
+
+
+async def seed_todos(session, user_id: int, count: int):
+    for start in range(0, count, SEED_CHUNK):
+        await session.execute(
+            insert(Todo),
+            [
+                {
+                    'title': f'task {i}',
+                    'description': 'benchmark',
+                    'state': TodoState.todo,
+                    'user_id': user_id,
+                }
+                for i in range(start, min(count, start + SEED_CHUNK))
+            ],
+        )
+        await session.commit()
+
+
+def timed(func, *args, **kwargs):
+    start = perf_counter()
+    result = func(*args, **kwargs)
+    return result, perf_counter() - start
+
+
+@pytest.fixture()
+def _no_rate_limit(monkeypatch):
+    monkeypatch.setattr(todos_rate_limiter, 'rate', 0)
+
+
+@pytest.mark.usefixtures('_no_rate_limit')
+def test_batch_writes_beat_single_writes(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'a', 'description': 'b', 'state': 'todo'}
+
+    def single():
+        for _ in range(WRITE_COUNT):
+            client.post('/todos/', headers=headers, json=todo)
+
+    def batch():
+        for start in range(0, WRITE_COUNT, 500):
+            size = min(500, WRITE_COUNT - start)
+            client.post(
+                '/todos/batch', headers=headers, json={'todos': [todo] * size}
+            )
+
+    _, single_seconds = timed(single)
+    _, batch_seconds = timed(batch)
+
+    print(
+        f'\n{WRITE_COUNT} todos: single {single_seconds:.3f}s, '
+        f'batch {batch_seconds:.3f}s'
+    )
+    assert batch_seconds < single_seconds
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_no_rate_limit')
+async def test_deep_keyset_page_costs_as_much_as_first(
+    session, client, user, token
+):
+    await seed_todos(session, user.id, PAGE_SIZE * DEEP_PAGE)
+    deep = (
+        await session.execute(
+            select(Todo.created_at, Todo.id)
+            .where(Todo.user_id == user.id)
+            .order_by(Todo.created_at, Todo.id)
+            .offset(PAGE_SIZE * (DEEP_PAGE - 1) - 1)
+            .limit(1)
+        )
+    ).one()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def page(cursor=''):
+        best = float('inf')
+        for _ in range(5):
+            response, seconds = timed(
+                client.get,
+                f'/todos/?limit={PAGE_SIZE}&cursor={cursor}',
+                headers=headers,
+            )
+            assert response.status_code == HTTPStatus.OK
+            best = min(best, seconds)
+        return response.json()['todos'], best
+
+    first, first_seconds = page()
+    last, deep_seconds = page(encode_cursor(*deep))
+
+    print(
+        f'\nkeyset page 1 {first_seconds * 1000:.1f}ms, '
+        f'page {DEEP_PAGE} {deep_seconds * 1000:.1f}ms'
+    )
+    assert first[0]['id'] == 1
+    assert last[0]['id'] == deep.id + 1
+    assert deep_seconds < first_seconds * 3 + 0.05  # noqa: PLR2004
+
+
+@pytest.mark.asyncio()
+async def test_export_memory_stays_flat(engine, session, user, other_user):
+    await seed_todos(session, other_user.id, EXPORT_BATCH_SIZE * 2)
+    await seed_todos(session, user.id, EXPORT_ROWS)
+
+    async def peak_memory(user_id):
+        query = (
+            select(*TODO_COLUMNS)
+            .where(Todo.user_id == user_id)
+            .order_by(Todo.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        rows = 0
+        tracemalloc.start()
+        try:
+            async for chunk in stream_export(
+                engine, query, ExportFormat.ndjson
+            ):
+                rows += chunk.count('\n')
+            return rows, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small_rows, small_peak = await peak_memory(other_user.id)
+    large_rows, large_peak = await peak_memory(user.id)
+
+    print(
+        f'\nexport peak: {small_rows} rows {small_peak / 2**20:.1f}MiB, '
+        f'{large_rows} rows {large_peak / 2**20:.1f}MiB'
+    )
+    assert large_rows == EXPORT_ROWS
+    assert large_peak < small_peak * 3
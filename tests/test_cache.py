@@ -0,0 +1,191 @@
+import asyncio
+from time import monotonic
+
+import pytest
+import pytest_asyncio
+
+from fast_zero.cache import (
+    Cache,
+    CacheError,
+    MemoryBackend,
+    RedisBackend,
+    encode_command,
+    read_reply,
+)
+
+
+@pytest_asyncio.fixture()
+async def redis_url():
+    data = {}
+
+    async def handle(reader, writer):
+        while not reader.at_eof():
+            try:
+                command = await read_reply(reader)
+            except asyncio.IncompleteReadError:
+                break
+
+            name, *args = command
+            name = name.upper()
+
+            if name == b'GET':
+                reply = data.get(args[0])
+                writer.write(
+                    b'$-1\r\n'
+                    if reply is None
+                    else b'$%d\r\n%b\r\n' % (len(reply), reply)
+                )
+            elif name == b'SET':
+                data[args[0]] = args[1]
+                writer.write(b'+OK\r\n')
+            elif name == b'DEL':
+                writer.write(
+                    b':%d\r\n' % int(data.pop(args[0], None) is not None)
+                )
+            elif name == b'INCR':
+                data[args[0]] = b'%d' % (int(data.get(args[0], 0)) + 1)
+                writer.write(b':%b\r\n' % data[args[0]])
+            else:
+                writer.write(b'+OK\r\n')
+            await writer.drain()
+
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()
+
+    yield f'redis://{host}:{port}/0'
+
+    server.close()
+
+
+def test_encode_command():
+    assert encode_command('GET', 'key') == b'*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n'
+
+
+@pytest.mark.asyncio()
+async def test_redis_backend_roundtrip(redis_url):
+    backend = RedisBackend(redis_url)
+
+    assert await backend.get('key') is None
+
+    await backend.set('key', b'value', ttl=10)
+    assert await backend.get('key') == b'value'
+
+    await backend.delete('key')
+    assert await backend.get('key') is None
+
+    assert await backend.incr('counter', ttl=10) == 1
+    assert await backend.incr('counter') == 2  # noqa: PLR2004
+
+    await backend.close()
+
+
+@pytest.mark.asyncio()
+async def test_redis_backend_cancelled_command_drops_connection():
+    async def handle(reader, writer):
+        while not reader.at_eof():
+            try:
+                _, key = await read_reply(reader)
+            except asyncio.IncompleteReadError:
+                break
+
+            await asyncio.sleep(0.1)
+            writer.write(b'$%d\r\n%b\r\n' % (len(key), key.upper()))
+            await writer.drain()
+
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()
+    backend = RedisBackend(f'redis://{host}:{port}/0')
+
+    slow = asyncio.create_task(backend.get('user:a'))
+    await asyncio.sleep(0.05)
+    slow.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await slow
+
+    assert await backend.get('user:b') == b'USER:B'
+
+    await backend.close()
+    server.close()
+
+
+@pytest.mark.asyncio()
+async def test_redis_backend_unreachable_is_a_cache_miss():
+    cache = Cache(RedisBackend('redis://127.0.0.1:1', timeout=0.1), 'x:', 10)
+
+    await cache.set('key', b'value')
+
+    assert await cache.get('key') is None
+    assert cache.stats()['misses'] == 1
+
+
+@pytest.mark.asyncio()
+async def test_redis_backend_blackholed_fails_fast_and_backs_off():
+    connections = []
+
+    async def handle(reader, writer):
+        # Accepts connections but never answers, not even AUTH
+        connections.append(writer)
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()
+    backend = RedisBackend(
+        f'redis://:secret@{host}:{port}/0',
+        timeout=0.1,
+        pool_size=2,
+        retry_after=30,
+    )
+
+    start = monotonic()
+    results = await asyncio.gather(
+        *(backend.get(f'user:{i}') for i in range(5)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, CacheError) for result in results)
+    assert monotonic() - start < 0.5  # noqa: PLR2004
+    assert len(connections) == 2  # noqa: PLR2004
+
+    with pytest.raises(CacheError):
+        await backend.get('user:a')
+    assert len(connections) == 2  # noqa: PLR2004
+
+    await backend.close()
+    server.close()
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(maxsize=2)
+
+    await backend.set('a', b'1')
+    await backend.set('b', b'2')
+    await backend.get('a')
+    await backend.set('c', b'3')
+
+    assert await backend.get('a') == b'1'
+    assert await backend.get('b') is None
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_expires_keys():
+    backend = MemoryBackend(maxsize=10)
+
+    await backend.set('key', b'value', ttl=0)
+
+    assert await backend.get('key') is None
+
+
+@pytest.mark.asyncio()
+async def test_cache_counts_hits_and_misses():
+    cache = Cache(MemoryBackend(maxsize=10), 'x:', 10)
+
+    await cache.get('key')
+    await cache.set('key', b'value')
+
+    assert await cache.get('key') == b'value'
+    assert cache.stats() == {'backend': 'memory', 'hits': 1, 'misses': 1}
@@ -1,19 +1,103 @@
-from sqlalchemy import select
+from datetime import datetime
 
-from fast_zero.models import User
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select, text
 
+from fast_zero.models import Todo, TodoState, User, is_trash
+from fast_zero.pagination import encode_cursor, paginate
+from fast_zero.search import search_todos
 
-def test_create_user(session):
+
+@pytest.mark.asyncio()
+async def test_create_user(session):
     user = User(
         username='dunossauro', email='duno@ssauro.com', password='senha123'
     )
 
     session.add(user)
-    session.commit()
+    await session.commit()
 
-    result = session.scalar(
+    result = await session.scalar(
         select(User).where(User.email == 'duno@ssauro.com')
     )
 
     assert result.id == 1
     assert result.username == 'dunossauro'
+
+
+async def explain(session, query):
+    compiled = query.compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={'render_postcompile': True},
+    )
+    connection = await session.connection()
+    plan = await connection.exec_driver_sql(
+        f'EXPLAIN {compiled}', compiled.params
+    )
+    return '\n'.join(plan.scalars())
+
+
+@pytest_asyncio.fixture()
+async def seeded_todos(session):
+    if session.bind.dialect.name != 'postgresql':
+        pytest.skip('query plans are checked against PostgreSQL')
+
+    users, todos_per_user = 20, 500
+    await session.execute(
+        insert(User),
+        [
+            {
+                'username': f'user{i}',
+                'email': f'user{i}@test.com',
+                'password': 'secret',
+            }
+            for i in range(users)
+        ],
+    )
+    states = list(TodoState)
+    await session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'task {i}',
+                'description': 'needle' if i == 0 else 'routine work',
+                'state': states[i % len(states)],
+                'user_id': user_id,
+            }
+            for user_id in range(1, users + 1)
+            for i in range(todos_per_user)
+        ],
+    )
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+
+    return select(Todo.id).where(Todo.user_id == 1)
+
+
+@pytest.mark.asyncio()
+async def test_list_by_state_uses_state_index(session, seeded_todos):
+    plan = await explain(
+        session, seeded_todos.where(Todo.state == TodoState.done)
+    )
+
+    assert 'ix_todos_user_id_state' in plan
+
+
+@pytest.mark.asyncio()
+async def test_keyset_page_uses_created_at_index(session, seeded_todos):
+    cursor = encode_cursor(datetime(2000, 1, 1), 0)
+    query = paginate(seeded_todos.where(~is_trash()), Todo, cursor, 10)
+
+    plan = await explain(session, query)
+
+    assert 'ix_todos_user_id_created_at_id' in plan
+
+
+@pytest.mark.asyncio()
+async def test_search_uses_search_index(session, seeded_todos):
+    query = search_todos(seeded_todos, 'needle', 'postgresql').limit(10)
+
+    plan = await explain(session, query)
+
+    assert 'ix_todos_search' in plan
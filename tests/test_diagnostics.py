@@ -0,0 +1,83 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event, select
+from starlette.requests import Request
+
+from fast_zero.diagnostics import QueryDiagnostics, StatementBudgetExceeded
+from fast_zero.models import User
+
+
+@pytest.fixture()
+def diagnostics(engine):
+    created = []
+
+    def make_diagnostics(**kwargs):
+        diagnostics = QueryDiagnostics(**kwargs)
+        diagnostics.instrument(engine)
+        created.append(diagnostics)
+        return diagnostics
+
+    yield make_diagnostics
+
+    for diagnostics in created:
+        for name, fn in (
+            ('before_cursor_execute', diagnostics._on_before),
+            ('after_cursor_execute', diagnostics._on_after),
+        ):
+            event.remove(engine.sync_engine, name, fn)
+
+
+@pytest.mark.asyncio()
+async def test_repeated_statements_are_flagged(session, diagnostics, caplog):
+    diagnostics = diagnostics(slow_threshold=60, repeat_threshold=2, budget=0)
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.diagnostics'):
+        with diagnostics.track(Request({'type': 'http'})) as statements:
+            for user_id in (1, 2):
+                await session.scalar(select(User).where(User.id == user_id))
+
+    assert statements.count == 2  # noqa: PLR2004
+    assert 'Possible N+1 on <unmatched>: 2 identical' in caplog.text
+
+
+@pytest.mark.asyncio()
+async def test_slow_statements_are_logged(session, diagnostics, caplog):
+    diagnostics(slow_threshold=0, repeat_threshold=10, budget=0)
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.diagnostics'):
+        await session.scalar(select(User.id))
+
+    assert 'Slow query' in caplog.text
+
+
+@pytest.mark.asyncio()
+async def test_budget_breach_is_logged_when_not_strict(
+    session, diagnostics, caplog
+):
+    diagnostics = diagnostics(slow_threshold=60, repeat_threshold=10, budget=1)
+
+    with caplog.at_level(logging.ERROR, logger='fast_zero.diagnostics'):
+        with diagnostics.track(Request({'type': 'http'})):
+            await session.scalar(select(User.id))
+            await session.scalar(select(User.username))
+
+    assert 'Statement budget exceeded: <unmatched> ran 2' in caplog.text
+
+
+def test_endpoint_within_statement_budget(client, token, statement_budget):
+    statement_budget(3)
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_endpoint_over_statement_budget(client, token, statement_budget):
+    statement_budget(2)
+
+    with pytest.raises(StatementBudgetExceeded, match='/todos/'):
+        client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
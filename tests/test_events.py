@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.events import (
+    RESYNC,
+    MemoryBroker,
+    PostgresBroker,
+    broker,
+    event_stream,
+)
+
+
+@pytest.mark.asyncio()
+async def test_broker_delivers_to_owner_only():
+    memory = MemoryBroker(queue_size=10)
+
+    with memory.subscribe(1) as queue, memory.subscribe(2) as other:
+        await memory.publish(1, {'type': 'created', 'ids': [1]})
+
+        assert queue.get_nowait() == {'type': 'created', 'ids': [1]}
+        assert other.empty()
+
+    assert memory.stats() == {
+        'backend': 'memory',
+        'subscribers': 0,
+        'dropped': 0,
+    }
+
+
+@pytest.mark.asyncio()
+async def test_broker_replaces_backlog_with_resync():
+    memory = MemoryBroker(queue_size=2)
+
+    with memory.subscribe(1) as queue:
+        for todo_id in range(3):
+            await memory.publish(1, {'type': 'created', 'ids': [todo_id]})
+
+        assert queue.get_nowait() == RESYNC
+        assert queue.empty()
+        assert memory.dropped == 1
+
+
+@pytest.mark.asyncio()
+async def test_event_stream_formats_events_and_heartbeats():
+    memory = MemoryBroker(queue_size=10)
+    stream = event_stream(memory, 1, heartbeat=0.01)
+
+    assert await anext(stream) == ': connected\n\n'
+    assert await anext(stream) == ': keepalive\n\n'
+
+    await memory.publish(1, {'type': 'deleted', 'ids': [3]})
+
+    assert await anext(stream) == (
+        'event: deleted\ndata: {"type": "deleted", "ids": [3]}\n\n'
+    )
+    await stream.aclose()
+    assert not memory.subscribers
+
+
+def test_todo_writes_publish_events(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with broker.subscribe(user.id) as queue:
+        client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': 'a', 'description': 'b', 'state': 'draft'},
+        )
+        client.patch('/todos/1', headers=headers, json={'state': 'done'})
+        client.delete('/todos/1', headers=headers)
+
+        events = [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert events == [
+        {'type': 'created', 'ids': [1]},
+        {'type': 'updated', 'ids': [1]},
+        {'type': 'deleted', 'ids': [1]},
+    ]
+
+
+def test_stream_events_requires_token(client):
+    response = client.get('/todos/events')
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_postgres_broker_uses_libpq_url():
+    postgres = PostgresBroker('postgresql+psycopg://app:secret@db/app', 10)
+
+    assert postgres.conninfo == 'postgresql://app:secret@db/app'
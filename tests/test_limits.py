@@ -0,0 +1,55 @@
+from http import HTTPStatus
+
+from fast_zero.limits import RateLimiter, auth_rate_limiter, load_shedder
+
+
+def test_rate_limiter_refills_over_time(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr('fast_zero.limits.monotonic', lambda: now)
+    limiter = RateLimiter('test', per_minute=60, burst=2)
+
+    assert limiter.acquire('key') == 0
+    assert limiter.acquire('key') == 0
+    assert limiter.acquire('key') == 1
+    assert limiter.acquire('other') == 0
+
+    now += 1
+
+    assert limiter.acquire('key') == 0
+    assert limiter.stats() == {'allowed': 4, 'rejected': 1}
+
+
+def test_rate_limiter_disabled_at_zero_rate():
+    limiter = RateLimiter('test', per_minute=0, burst=0)
+
+    assert [limiter.acquire('key') for _ in range(3)] == [0, 0, 0]
+    assert limiter.stats() == {'allowed': 3, 'rejected': 0}
+
+
+def test_login_is_rate_limited(client, user, monkeypatch):
+    monkeypatch.setattr(auth_rate_limiter, 'burst', 1)
+    data = {'username': user.email, 'password': user.clean_password}
+
+    assert client.post('/auth/token/', data=data).status_code == HTTPStatus.OK
+
+    response = client.post('/auth/token/', data=data)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.headers['Retry-After']
+
+
+def test_load_shedder_rejects_when_saturated(client, monkeypatch):
+    monkeypatch.setattr(load_shedder, 'max_in_flight', 1)
+    monkeypatch.setattr(load_shedder, 'in_flight', 1)
+
+    response = client.get('/')
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_read_limit_stats(client):
+    response = client.get('/metrics/limits')
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()['rate_limiters']) == {'auth', 'todos'}
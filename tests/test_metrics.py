@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event, select
+
+from fast_zero.metrics import Histogram, PoolMetrics, StatementMetrics
+from fast_zero.models import User
+
+
+@pytest.fixture()
+def pool_metrics(engine):
+    metrics = PoolMetrics()
+    metrics.instrument(engine)
+
+    yield metrics
+
+    event.remove(engine.sync_engine, 'checkout', metrics._on_checkout)
+
+
+@pytest.fixture()
+def statement_metrics(engine):
+    metrics = StatementMetrics()
+    metrics.instrument(engine)
+
+    yield metrics
+
+    for name, fn in (
+        ('before_cursor_execute', metrics._on_before),
+        ('after_cursor_execute', metrics._on_after),
+    ):
+        event.remove(engine.sync_engine, name, fn)
+
+
+def test_histogram_cumulative_buckets():
+    histogram = Histogram([0.1, 1])
+
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert histogram.snapshot() == {
+        'buckets': {'0.1': 1, '1': 2, '+Inf': 3},
+        'count': 3,
+        'sum': 5.55,
+    }
+
+
+@pytest.mark.asyncio()
+async def test_pool_metrics_records_checkout(session, pool_metrics):
+    await pool_metrics.connect(session)
+
+    snapshot = pool_metrics.snapshot()
+    assert snapshot['checkouts'] == 1
+    assert snapshot['checkout_wait']['count'] == 1
+
+
+def test_read_pool_stats(client):
+    response = client.get('/metrics/pool')
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()) == {
+        'size',
+        'checked_out',
+        'overflow',
+        'checkouts',
+        'overflow_events',
+        'checkout_wait',
+    }
+
+
+@pytest.mark.asyncio()
+async def test_statement_metrics_time_by_verb(statement_metrics, session):
+    await session.scalar(select(User.id))
+
+    assert statement_metrics.durations['SELECT'].count == 1
+
+
+def test_request_metrics_use_route_template(client, user, token):
+    client.get('/todos/1', headers={'Authorization': f'Bearer {token}'})
+    client.get('/does-not-exist')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_responses_total{method="GET",route="/todos/{todo_id}",'
+        'status="404"} 1'
+    ) in response.text
+    assert (
+        'http_responses_total{method="GET",route="<unmatched>",'
+        'status="404"} 1'
+    ) in response.text
+    assert 'http_requests_in_flight 1' in response.text
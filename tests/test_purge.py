@@ -0,0 +1,31 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from fast_zero.counters import adjust_counters, read_counters
+from fast_zero.models import Todo, TodoState
+from fast_zero.purge import purge_trash
+from tests.conftest import TodoFactory
+
+
+@pytest.mark.asyncio()
+async def test_purge_trash_deletes_old_trash_in_batches(session, user):
+    session.add_all(
+        TodoFactory.create_batch(5, user_id=user.id, state=TodoState.trash)
+    )
+    session.add(TodoFactory(user_id=user.id, state=TodoState.todo))
+    await adjust_counters(session, Counter({(user.id, TodoState.trash): 5}))
+    await session.commit()
+
+    now = datetime.now()
+
+    assert await purge_trash(session, now - timedelta(days=1), 2) == 0
+    assert await purge_trash(session, now + timedelta(days=1), 2) == 5  # noqa: PLR2004
+
+    states = await session.scalars(select(Todo.state))
+    assert states.all() == [TodoState.todo]
+
+    counters = await read_counters(session, user.id)
+    assert counters['states'][TodoState.trash] == 0
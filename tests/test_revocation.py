@@ -0,0 +1,61 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.models import RevokedToken
+from fast_zero.revocation import RevocationList, revocation_list, utcnow
+from fast_zero.tokens import token_verifier
+
+
+def test_logout_revokes_token(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/auth/logout', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Token revoked'}
+    assert len(revocation_list) == 1
+
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio()
+async def test_logout_token_revoked_by_another_worker(session, client, token):
+    # The row exists but this worker has not synced it yet
+    session.add(
+        RevokedToken(
+            jti=token_verifier.verify(token)['jti'],
+            expires_at=utcnow() + timedelta(hours=1),
+        )
+    )
+    await session.commit()
+
+    response = client.post(
+        '/auth/logout', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(revocation_list) == 1
+
+
+@pytest.mark.asyncio()
+async def test_sync_loads_revocations_and_drops_expired(session):
+    now = utcnow()
+    session.add_all([
+        RevokedToken(jti='live', expires_at=now + timedelta(hours=1)),
+        RevokedToken(jti='expired', expires_at=now - timedelta(hours=1)),
+    ])
+    await session.commit()
+
+    revoked = RevocationList()
+    revoked.add('local', now + timedelta(hours=1))
+    await revoked.sync(session)
+
+    assert revoked.is_revoked('live')
+    assert revoked.is_revoked('local')
+    assert not revoked.is_revoked('expired')
+    assert not revoked.is_revoked(None)
+    assert await session.get(RevokedToken, 'expired') is None
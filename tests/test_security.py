@@ -1,8 +1,10 @@
+import json
 from http import HTTPStatus
 
+import pytest
 from jwt import decode
 
-from fast_zero.security import create_access_token, settings
+from fast_zero.security import create_access_token, settings, user_cache
 
 
 def test_jwt():
@@ -15,6 +17,7 @@ def test_jwt():
 
     assert decoded['sub'] == data['sub']
     assert decoded['exp']
+    assert decoded['jti']
 
 
 def test_jwt_invalid_token(client):
@@ -45,3 +48,49 @@ def test_jwt_invalid_username(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_current_user_is_cached(client, user, token):
+    for _ in range(2):
+        response = client.post(
+            '/auth/refresh_token',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    assert user_cache.stats()['misses'] == 1
+    assert user_cache.stats()['hits'] == 1
+
+
+@pytest.mark.asyncio()
+async def test_cached_user_has_no_password_hash(client, user, token):
+    client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    cached = json.loads(await user_cache.get(user.email))
+
+    assert cached['email'] == user.email
+    assert 'password' not in cached
+
+
+def test_update_password_of_cached_user(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    response = client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': user.username,
+            'password': 'new-secret',
+            'email': user.email,
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': 'new-secret'},
+    )
+    assert response.status_code == HTTPStatus.OK
@@ -1,19 +1,42 @@
+import json
 from http import HTTPStatus
 
-from fast_zero.models import TodoState
-from tests.conftest import TodoFactory
-
-
-def test_create_todo(client, token):
-    response = client.post(
-        '/todos/',
-        headers={'Authorization': f'Bearer {token}'},
-        json={
-            'title': 'Test todo',
-            'description': 'Test todo description',
-            'state': 'draft',
-        },
-    )
+import pytest
+from sqlalchemy import select
+
+from fast_zero import sync
+from fast_zero.export import ExportFormat, stream_export
+from fast_zero.models import Todo, TodoState
+from fast_zero.routers import todos
+from fast_zero.serialization import TODO_COLUMNS
+from tests.conftest import TodoFactory, count_statements
+
+
+@pytest.fixture()
+def changes_lag(monkeypatch):
+    def set_lag(seconds):
+        monkeypatch.setattr(
+            sync.settings, 'CHANGES_SAFETY_LAG_SECONDS', seconds
+        )
+
+    set_lag(0)
+    return set_lag
+
+
+def test_create_todo(client, token, engine):
+    with count_statements(engine) as statements:
+        response = client.post(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'title': 'Test todo',
+                'description': 'Test todo description',
+                'state': 'draft',
+            },
+        )
+
+    # current user lookup + INSERT ... RETURNING + counter and version upserts
+    assert len(statements) == 4  # noqa: PLR2004
     assert response.json() == {
         'id': 1,
         'title': 'Test todo',
@@ -22,11 +45,12 @@ def test_create_todo(client, token):
     }
 
 
-def test_list_todos_return_5(session, client, user, token):
+@pytest.mark.asyncio()
+async def test_list_todos_return_5(session, client, user, token):
     expected_todos = 5
-    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id))
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
 
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/', headers={'Authorization': f'Bearer {token}'}
@@ -35,27 +59,58 @@ def test_list_todos_return_5(session, client, user, token):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_list_todos_return_2(session, client, user, token):
+@pytest.mark.asyncio()
+async def test_list_todos_return_2(session, client, user, token):
     expected_todos = 2
-    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id))
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
 
-    session.commit()
+    await session.commit()
 
     response = client.get(
-        '/todos/?offset=1&limit=2',
+        '/todos/?limit=2',
         headers={'Authorization': f'Bearer {token}'},
     )
 
     assert len(response.json()['todos']) == expected_todos
+    assert response.json()['next_cursor']
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_cursor_walks_all_pages(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    ids = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(
+            f'/todos/?limit=2&cursor={cursor}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        ids += [todo['id'] for todo in response.json()['todos']]
+        cursor = response.json()['next_cursor']
+
+    assert ids == [1, 2, 3, 4, 5]
 
 
-def test_list_todos_filter_title_return_5(session, client, user, token):
+def test_list_todos_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/?cursor=invalid',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_filter_title_return_5(session, client, user, token):
     expected_todos = 5
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(5, user_id=user.id, title='Test todo 1')
     )
 
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/?title=Test todo 1',
@@ -66,13 +121,16 @@ def test_list_todos_filter_title_return_5(session, client, user, token):
     assert response.json()['todos'][0]['title'] == 'Test todo 1'
 
 
-def test_list_todos_filter_description_return_5(session, client, user, token):
+@pytest.mark.asyncio()
+async def test_list_todos_filter_description_return_5(
+    session, client, user, token
+):
     expected_todos = 5
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(5, user_id=user.id, description='Description')
     )
 
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/?description=Desc',
@@ -83,13 +141,30 @@ def test_list_todos_filter_description_return_5(session, client, user, token):
     assert response.json()['todos'][0]['description'] == 'Description'
 
 
-def test_list_todos_filter_state_return_5(session, client, user, token):
+@pytest.mark.asyncio()
+async def test_list_todos_search(session, client, user, token):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Buy milk', description='Market'),
+        TodoFactory(user_id=user.id, title='Walk', description='Dog park'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=milk',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == ['Buy milk']
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_filter_state_return_5(session, client, user, token):
     expected_todos = 5
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(5, user_id=user.id, state=TodoState.doing)
     )
 
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/?state=doing',
@@ -100,11 +175,12 @@ def test_list_todos_filter_state_return_5(session, client, user, token):
     assert response.json()['todos'][0]['state'] == 'doing'
 
 
-def test_get_by_id_todo(session, client, user, token):
+@pytest.mark.asyncio()
+async def test_get_by_id_todo(session, client, user, token):
     todo = TodoFactory(user_id=user.id)
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     response = client.get(
         f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
@@ -138,26 +214,55 @@ def test_patch_todo_error(client, token):
     assert response.json() == {'detail': 'Task not found.'}
 
 
-def test_patch_todo(session, client, user, token):
+@pytest.mark.asyncio()
+async def test_patch_todo(session, client, user, token, engine):
     todo = TodoFactory(user_id=user.id)
 
     session.add(todo)
-    session.commit()
+    await session.commit()
+
+    with count_statements(engine) as statements:
+        response = client.patch(
+            f'/todos/{todo.id}',
+            json={'title': 'teste!'},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+    assert response.status_code == HTTPStatus.OK
+    # current user lookup + todo lookup + UPDATE ... RETURNING + version upsert
+    assert len(statements) == 4  # noqa: PLR2004
+    assert response.json()['title'] == 'teste!'
 
-    response = client.patch(
-        f'/todos/{todo.id}',
-        json={'title': 'teste!'},
-        headers={'Authorization': f'Bearer {token}'},
+
+def test_todo_stats_follow_writes(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'a', 'description': 'b', 'state': 'draft'}
+
+    client.post('/todos/batch', headers=headers, json={'todos': [todo] * 3})
+    client.post('/todos/', headers=headers, json={**todo, 'state': 'todo'})
+    client.patch('/todos/1', headers=headers, json={'state': 'doing'})
+    client.patch(
+        '/todos/batch',
+        headers=headers,
+        json={'todos': [{'id': 2, 'state': 'done'}]},
     )
+    client.delete('/todos/3', headers=headers)
+    client.delete('/todos/batch?ids=4', headers=headers)
+
+    response = client.get('/todos/stats', headers=headers)
+
     assert response.status_code == HTTPStatus.OK
-    assert response.json()['title'] == 'teste!'
+    assert response.json() == {
+        'states': {'draft': 0, 'todo': 0, 'doing': 1, 'done': 1, 'trash': 2},
+        'active': 2,
+    }
 
 
-def test_delete_todo(session, client, user, token):
-    todo = TodoFactory(user_id=user.id)
+@pytest.mark.asyncio()
+async def test_delete_todo(session, client, user, token):
+    todo = TodoFactory(user_id=user.id, state=TodoState.todo)
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     response = client.delete(
         f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
@@ -168,6 +273,68 @@ def test_delete_todo(session, client, user, token):
         'message': 'Task has been deleted successfully.'
     }
 
+    await session.refresh(todo)
+    assert todo.state == TodoState.trash
+
+
+@pytest.mark.asyncio()
+async def test_delete_todo_twice(session, client, user, token):
+    todo = TodoFactory(user_id=user.id, state=TodoState.trash)
+    session.add(todo)
+    await session.commit()
+
+    response = client.delete(
+        f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio()
+async def test_get_trashed_todo(session, client, user, token):
+    todo = TodoFactory(user_id=user.id, state=TodoState.trash)
+    session.add(todo)
+    await session.commit()
+
+    response = client.get(
+        f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio()
+async def test_patch_trashed_todo(session, client, user, token):
+    todo = TodoFactory(user_id=user.id, state=TodoState.trash)
+    session.add(todo)
+    await session.commit()
+
+    response = client.patch(
+        f'/todos/{todo.id}',
+        json={'title': 'restored'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    await session.refresh(todo)
+    assert todo.title != 'restored'
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_excludes_trash(session, client, user, token):
+    session.add_all(
+        TodoFactory.create_batch(2, user_id=user.id, state=TodoState.todo)
+    )
+    session.add(TodoFactory(user_id=user.id, state=TodoState.trash))
+    await session.commit()
+
+    headers = {'Authorization': f'Bearer {token}'}
+    listed = client.get('/todos/', headers=headers).json()['todos']
+    trashed = client.get('/todos/?state=trash', headers=headers).json()
+
+    assert {todo['state'] for todo in listed} == {'todo'}
+    assert len(trashed['todos']) == 1
+
 
 def test_delete_todo_error(client, token):
     response = client.delete(
@@ -176,3 +343,349 @@ def test_delete_todo_error(client, token):
 
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'Task not found.'}
+
+
+def test_create_todos_batch(client, token):
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'title': 'First', 'description': 'One', 'state': 'draft'},
+                {'title': 'Second', 'description': 'Two', 'state': 'todo'},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'First',
+        'Second',
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_patch_todos_batch(session, client, user, other_user, token):
+    todo = TodoFactory(user_id=user.id)
+    other_todo = TodoFactory(user_id=other_user.id)
+    session.add_all([todo, other_todo])
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'id': todo.id, 'state': 'done'},
+                {'id': other_todo.id, 'state': 'done'},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'results': [
+            {'id': todo.id, 'status': 'updated'},
+            {'id': other_todo.id, 'status': 'not_found'},
+        ]
+    }
+
+    response = client.get(
+        f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.json()['state'] == 'done'
+
+
+@pytest.mark.asyncio()
+async def test_delete_todos_batch(session, client, user, token):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.delete(
+        f'/todos/batch?ids={todo.id}&ids=10',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'results': [
+            {'id': todo.id, 'status': 'deleted'},
+            {'id': 10, 'status': 'not_found'},
+        ]
+    }
+
+
+@pytest.mark.asyncio()
+async def test_export_todos_ndjson(session, client, user, other_user, token):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    todos = [json.loads(line) for line in response.text.splitlines()]
+    assert [todo['id'] for todo in todos] == [1, 2, 3]
+    assert set(todos[0]) == {'id', 'title', 'description', 'state'}
+
+
+@pytest.mark.asyncio()
+async def test_export_todos_csv(session, client, user, token):
+    session.add(
+        TodoFactory(
+            user_id=user.id,
+            title='a, b',
+            description='c',
+            state=TodoState.done,
+        )
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    lines = response.text.splitlines()
+    assert lines[0] == 'id,title,description,state'
+    assert lines[1] == '1,"a, b",c,done'
+
+
+@pytest.mark.asyncio()
+async def test_export_streams_one_chunk_per_batch(engine, session, user):
+    session.add_all(TodoFactory.create_batch(25, user_id=user.id))
+    await session.commit()
+    query = (
+        select(*TODO_COLUMNS)
+        .where(Todo.user_id == user.id)
+        .order_by(Todo.id)
+        .execution_options(yield_per=10)
+    )
+
+    chunks = [
+        chunk.splitlines()
+        async for chunk in stream_export(engine, query, ExportFormat.ndjson)
+    ]
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert [json.loads(line)['id'] for line in chunks[0]] == list(range(1, 11))
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_fast_json(session, client, user, token, monkeypatch):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?limit=2', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    monkeypatch.setattr(todos.settings, 'FAST_JSON_RESPONSES', True)
+    fast_response = client.get(
+        '/todos/?limit=2', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert fast_response.status_code == HTTPStatus.OK
+    assert fast_response.json() == response.json()
+
+
+@pytest.mark.asyncio()
+async def test_get_by_id_todo_not_modified(session, client, user, token):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get(f'/todos/{todo.id}', headers=headers)
+    etag = response.headers['ETag']
+
+    response = client.get(
+        f'/todos/{todo.id}', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+
+    client.patch(f'/todos/{todo.id}', json={'title': 'new'}, headers=headers)
+
+    response = client.get(
+        f'/todos/{todo.id}', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_not_modified(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.delete('/todos/1', headers=headers)
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()['todos']) == 1
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_etag_changes_on_every_write(
+    session, client, user, token
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    etags = {client.get('/todos/', headers=headers).headers['ETag']}
+    for title in ('first', 'second'):
+        client.patch(
+            f'/todos/{todo.id}', headers=headers, json={'title': title}
+        )
+        etags.add(client.get('/todos/', headers=headers).headers['ETag'])
+
+    assert len(etags) == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio()
+async def test_list_todos_response_cache(
+    session, client, user, token, monkeypatch
+):
+    monkeypatch.setattr(todos.response_cache, 'ttl', 10)
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/todos/', headers=headers)
+    cached_response = client.get('/todos/', headers=headers)
+
+    assert todos.response_cache.hits == 1
+    assert cached_response.headers['ETag'] == response.headers['ETag']
+    assert cached_response.json() == response.json()
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('changes_lag')
+async def test_todo_changes_since_watermark(session, client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    )
+    await session.commit()
+
+    initial = client.get('/todos/changes', headers=headers).json()
+    assert [todo['id'] for todo in initial['created']] == [1, 2, 3]
+    assert initial['has_more'] is False
+
+    client.patch('/todos/1', headers=headers, json={'state': 'done'})
+    client.delete('/todos/2', headers=headers)
+    client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'a', 'description': 'b', 'state': 'draft'},
+    )
+
+    response = client.get(
+        f'/todos/changes?cursor={initial["next_cursor"]}', headers=headers
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    changes = response.json()
+    assert [todo['id'] for todo in changes['created']] == [4]
+    assert [todo['id'] for todo in changes['updated']] == [1]
+    assert changes['deleted'] == [2]
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('changes_lag')
+async def test_todo_changes_pages(session, client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    seen = []
+    cursor = ''
+    has_more = True
+    while has_more:
+        changes = client.get(
+            f'/todos/changes?limit=2&cursor={cursor}', headers=headers
+        ).json()
+        seen += [todo['id'] for todo in changes['created']]
+        cursor, has_more = changes['next_cursor'], changes['has_more']
+
+    assert seen == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio()
+async def test_todo_changes_wait_for_running_transactions(
+    engine, client, token, changes_lag
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'a', 'description': 'b', 'state': 'draft'}
+    client.post('/todos/', headers=headers, json=todo)
+    initial = client.get('/todos/changes', headers=headers).json()
+
+    # A transaction that is still running could commit changes stamped
+    # before the todo below, so it must not be returned yet
+    changes_lag(3600)
+    async with engine.connect() as conn:
+        await conn.execute(select(1))
+        client.post('/todos/', headers=headers, json=todo)
+
+        pending = client.get(
+            f'/todos/changes?cursor={initial["next_cursor"]}',
+            headers=headers,
+        ).json()
+
+    assert pending['created'] == []
+    assert pending['pending'] is True
+    assert pending['next_cursor'] == initial['next_cursor']
+
+    changes_lag(0)
+    response = client.get(
+        f'/todos/changes?cursor={pending["next_cursor"]}', headers=headers
+    )
+    assert [todo['id'] for todo in response.json()['created']] == [2]
+    assert response.json()['pending'] is False
+
+
+@pytest.mark.asyncio()
+async def test_todo_changes_hold_back_is_capped_by_lag(
+    engine, client, token, changes_lag
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'a', 'description': 'b', 'state': 'draft'}
+
+    # An unrelated long transaction only holds changes back for the lag
+    changes_lag(0)
+    async with engine.connect() as conn:
+        await conn.execute(select(1))
+        client.post('/todos/', headers=headers, json=todo)
+
+        changes = client.get('/todos/changes', headers=headers).json()
+
+    assert [todo['id'] for todo in changes['created']] == [1]
+    assert changes['pending'] is False
+
+
+def test_todo_changes_watermark_too_old(client, token):
+    response = client.get(
+        '/todos/changes?since=2000-01-01T00:00:00Z',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.GONE
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt import ExpiredSignatureError, decode
+
+from fast_zero import tokens
+from fast_zero.tokens import TokenVerifier, create_verifier
+
+
+def test_verify_caches_claims_until_expiry(monkeypatch):
+    verifier = TokenVerifier('HS256', 'secret', 'secret', maxsize=10)
+    token = verifier.create({'sub': 'a@a.com'}, timedelta(minutes=5))
+    calls = []
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args)
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr('fast_zero.tokens.decode', counting_decode)
+
+    assert verifier.verify(token)['sub'] == 'a@a.com'
+    assert verifier.verify(token)['sub'] == 'a@a.com'
+    assert len(calls) == 1
+
+
+def test_verify_rejects_expired_token():
+    verifier = TokenVerifier('HS256', 'secret', 'secret', maxsize=10)
+    token = verifier.create({'sub': 'a@a.com'}, timedelta(minutes=-1))
+
+    with pytest.raises(ExpiredSignatureError):
+        verifier.verify(token)
+
+
+@pytest.mark.parametrize('algorithm', ['RS256', 'EdDSA'])
+def test_asymmetric_tokens_verify_with_public_key(algorithm):
+    generate = {
+        'RS256': lambda: rsa.generate_private_key(65537, 2048),
+        'EdDSA': ed25519.Ed25519PrivateKey.generate,
+    }
+
+    private_key = generate[algorithm]()
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    verifier = TokenVerifier(algorithm, private_pem, public_pem, maxsize=10)
+
+    token = verifier.create({'sub': 'a@a.com'}, timedelta(minutes=5))
+
+    assert decode(token, public_pem, algorithms=[algorithm])['sub'] == (
+        'a@a.com'
+    )
+    assert verifier.jwks()['keys'][0]['alg'] == algorithm
+
+
+@pytest.mark.parametrize('algorithm', ['RS256', 'EdDSA'])
+def test_create_verifier_requires_key_pair(algorithm, monkeypatch):
+    monkeypatch.setattr(tokens.settings, 'ALGORITHM', algorithm)
+    monkeypatch.setattr(tokens.settings, 'JWT_PRIVATE_KEY', None)
+    monkeypatch.setattr(tokens.settings, 'JWT_PUBLIC_KEY', None)
+
+    with pytest.raises(RuntimeError, match='JWT_PRIVATE_KEY'):
+        create_verifier()
+
+
+def test_create_verifier_rejects_unknown_algorithm(monkeypatch):
+    monkeypatch.setattr(tokens.settings, 'ALGORITHM', 'XS256')
+
+    with pytest.raises(RuntimeError, match='Unsupported ALGORITHM'):
+        create_verifier()
+
+
+def test_read_jwks_for_symmetric_algorithm(client):
+    response = client.get('/auth/jwks')
+
+    assert response.json() == {'keys': []}
@@ -1,19 +1,28 @@
 from http import HTTPStatus
 
+import pytest
+from sqlalchemy import func, select
+
+from fast_zero.models import Todo
+from fast_zero.routers import users
 from fast_zero.schemas import UserPublic
+from tests.conftest import TodoFactory, count_statements
 
 
-def test_create_user(client):
-    response = client.post(
-        '/users/',
-        json={
-            'username': 'testeusername',
-            'password': 'password',
-            'email': 'test@test.com',
-        },
-    )
+def test_create_user(client, engine):
+    with count_statements(engine) as statements:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'testeusername',
+                'password': 'password',
+                'email': 'test@test.com',
+            },
+        )
 
     assert response.status_code == HTTPStatus.CREATED
+    # duplicate check + INSERT ... RETURNING
+    assert len(statements) == 2  # noqa: PLR2004
     assert response.json() == {
         'id': 1,
         'username': 'testeusername',
@@ -55,14 +64,17 @@ def test_read_users_with_user(client, user):
     user_schema = UserPublic.model_validate(user).model_dump()
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
 
 
-def test_read_users(client):
-    response = client.get('/users/')
+def test_read_users(client, engine):
+    with count_statements(engine) as statements:
+        response = client.get('/users/')
+
+    assert 'password' not in statements[0]
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
 
 
 def test_get_user(client, user):
@@ -81,18 +93,21 @@ def test_get_user_wrong_user(client):
     assert response.json() == {'detail': 'User not found'}
 
 
-def test_update_user(client, user, token):
-    response = client.put(
-        f'/users/{user.id}',
-        headers={'Authorization': f'Bearer {token}'},
-        json={
-            'username': 'testusername2',
-            'password': '123',
-            'email': 'test2@test.com',
-        },
-    )
+def test_update_user(client, user, token, engine):
+    with count_statements(engine) as statements:
+        response = client.put(
+            f'/users/{user.id}',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'username': 'testusername2',
+                'password': '123',
+                'email': 'test2@test.com',
+            },
+        )
 
     assert response.status_code == HTTPStatus.OK
+    # current user lookup + UPDATE ... RETURNING
+    assert len(statements) == 2  # noqa: PLR2004
     assert response.json() == {
         'id': 1,
         'username': 'testusername2',
@@ -124,6 +139,24 @@ def test_delete_user(client, user, token):
     assert response.json() == {'message': 'User deleted'}
 
 
+@pytest.mark.asyncio()
+async def test_delete_user_cascades_todos_in_database(
+    client, session, user, token, engine
+):
+    session.add_all(TodoFactory.create_batch(50, user_id=user.id))
+    await session.commit()
+
+    with count_statements(engine) as statements:
+        response = client.delete(
+            f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    # user lookup + DELETE users; todos go with ON DELETE CASCADE
+    assert len(statements) == 2  # noqa: PLR2004
+    assert await session.scalar(select(func.count(Todo.id))) == 0
+
+
 def test_delete_user_wrong_user(client, other_user, token):
     response = client.delete(
         f'/users/{other_user.id}', headers={'Authorization': f'Bearer {token}'}
@@ -131,3 +164,42 @@ def test_delete_user_wrong_user(client, other_user, token):
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permission'}
+
+
+def test_update_user_invalidates_cached_user(client, user, token):
+    client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {token}'}
+    )
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'testusername2',
+            'password': '123',
+            'email': 'test2@test.com',
+        },
+    )
+
+    response = client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_read_users_fast_json(client, user, other_user, monkeypatch):
+    response = client.get('/users/?limit=1')
+
+    monkeypatch.setattr(users.settings, 'FAST_JSON_RESPONSES', True)
+    fast_response = client.get('/users/?limit=1')
+
+    assert fast_response.status_code == HTTPStatus.OK
+    assert fast_response.json() == response.json()
+
+
+def test_get_user_not_modified(client, user):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED